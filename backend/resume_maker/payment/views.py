@@ -3,6 +3,7 @@ from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from adrf.views import APIView as AsyncAPIView
 from .models import Payment
 
 
@@ -91,13 +92,14 @@ class VerifyPaymentView(APIView):
             return Response({'error': str(e)}, status=400)
 
 
-class PaymentConfigView(APIView):
+class PaymentConfigView(AsyncAPIView):
     """
     GET: Return Stripe publishable key for frontend.
+    Async so it is served on the event loop, not queued behind sync work.
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         return Response({
             'publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
         })
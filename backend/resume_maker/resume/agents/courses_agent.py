@@ -1,10 +1,7 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
-
 # Agent for extracting courses and certifications from user input
 
 
@@ -18,43 +15,29 @@ class State(TypedDict):
     profile:str
 
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o-mini",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-# Nodes
-
-def get_courses_certifications(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Node function that queries an LLM to extract or generate
-        a user's relevant courses in the format:
-        <date>;<course>;<explanation>
-
-    🔹 Example output:
-        2023;Machine Learning (Coursera);Completed an online course covering supervised and unsupervised algorithms.
-
-    🔹 Expected input:
-        state: dict-like LangGraph State with key 'context' holding user information.
-
-    🔹 Returns:
-        dict with key 'courses' -> formatted string(s)
-    """
-
-    name = (state.get("name") or "The user").strip()
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "courses_and_certifications": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "course_or_certificate": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["date", "course_or_certificate", "description"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["courses_and_certifications"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist focused on identifying courses, certifications, "
     "and professional development from unstructured text.\n\n"
 
@@ -93,22 +76,55 @@ def get_courses_certifications(state: State) -> dict:
 )
 
 
-    user_prompt = (
+def _user_prompt(state: State) -> str:
+    return (
         f"Extract all courses, certifications, and professional training from this text. "
         f"Include ONLY courses/certifications that are explicitly mentioned:\n\n"
         f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
     )
 
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Extract all courses, certifications, and professional training from the text above. "
+    "Include ONLY courses/certifications that are explicitly mentioned."
+)
+
+
+def _result(msg: str) -> dict:
     courses_text = msg.strip() if msg else ""
 
     if not courses_text:
         courses_text = "2023;Data Structures and Algorithms;Focused on algorithmic problem solving and efficiency analysis."
 
-    state["courses"] = courses_text
     return {"courses": courses_text}
 
 
+# Nodes
 
+def get_courses_certifications(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Node function that queries an LLM to extract or generate
+        a user's relevant courses in the format:
+        <date>;<course>;<explanation>
+
+    🔹 Example output:
+        2023;Machine Learning (Coursera);Completed an online course covering supervised and unsupervised algorithms.
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'courses' -> formatted string(s)
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="courses",
+                     **shared.prompts(state, "courses", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "courses", msg))
 
 
+async def aget_courses_certifications(state: State) -> dict:
+    """Async variant of get_courses_certifications, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="courses",
+                            **shared.prompts(state, "courses", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "courses", msg))
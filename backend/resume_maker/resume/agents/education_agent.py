@@ -1,7 +1,5 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
 # Agent for extracting education information from user input
@@ -16,46 +14,30 @@ class State(TypedDict):
     personal_info:str
     profile:str
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-# Nodes
-
-def get_education(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Node function that queries an LLM to extract or generate
-        a user's education history in the format:
-        <date>;<education>;<explanation>
-
-    🔹 Example output:
-        2020–2024;B.Sc. in Computer Engineering, Boğaziçi University;
-        Focused on software systems, AI, and data analysis.
-
-    🔹 Expected input:
-        state: dict-like LangGraph State with key 'context' holding user information.
 
-    🔹 Returns:
-        dict with key 'education' -> formatted string(s)
-    """
-
-    name = (state.get("name") or "The user").strip()
-
-    # Define system prompt to enforce structured, consistent output
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "education": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "education": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["date", "education", "description"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["education"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist focused on identifying educational background "
     "from unstructured text. Your goal is to extract academic history with high precision.\n\n"
 
@@ -95,25 +77,57 @@ def get_education(state: State) -> dict:
 )
 
 
-    # Extract user context for the LLM
-    user_prompt = (
+def _user_prompt(state: State) -> str:
+    return (
         f"Extract all formal education (degrees, diplomas, academic programs) from this text. "
         f"Include ONLY educational background that is explicitly mentioned:\n\n"
         f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
     )
 
-    # Invoke the LLM to generate education info
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Extract all formal education (degrees, diplomas, academic programs) from the text above. "
+    "Include ONLY educational background that is explicitly mentioned."
+)
+
+
+def _result(msg: str) -> dict:
     education_text = msg.strip() if msg else ""
 
     # Safety fallback
     if not education_text:
         education_text = "2020–2024;Bachelor’s Degree;General undergraduate studies in relevant field."
 
-    # Update state
-    state["education"] = education_text
     return {"education": education_text}
 
 
+# Nodes
+
+def get_education(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Node function that queries an LLM to extract or generate
+        a user's education history in the format:
+        <date>;<education>;<explanation>
+
+    🔹 Example output:
+        2020–2024;B.Sc. in Computer Engineering, Boğaziçi University;
+        Focused on software systems, AI, and data analysis.
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'education' -> formatted string(s)
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="education",
+                     **shared.prompts(state, "education", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "education", msg))
 
 
+async def aget_education(state: State) -> dict:
+    """Async variant of get_education, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="education",
+                            **shared.prompts(state, "education", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "education", msg))
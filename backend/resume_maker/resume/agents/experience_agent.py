@@ -1,10 +1,7 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
-
 # Agent for extracting work experience from user input
 
 
@@ -17,45 +14,30 @@ class State(TypedDict):
     personal_info:str
     profile:str
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o-mini",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-# Nodes
 
-def get_experience(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Node function that queries an LLM to extract or generate
-        a user's work or internship experience in the format:
-        <date>;<position/company>;<explanation>
-
-    🔹 Example output:
-        2023–Present;AI Intern, Akbank;Developing credit-risk analysis models and automating data pipelines.
-
-    🔹 Expected input:
-        state: dict-like LangGraph State with key 'context' holding user information.
-
-    🔹 Returns:
-        dict with key 'experience' -> formatted string(s)
-    """
-
-    name = (state.get("name") or "The user").strip()
-
-    # Define system prompt to enforce structured, consistent output
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "experience": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "position_or_company": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["date", "position_or_company", "description"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["experience"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist focused on identifying professional work experience "
     "from unstructured text. Your goal is to extract employment history with high accuracy.\n\n"
 
@@ -93,25 +75,56 @@ def get_experience(state: State) -> dict:
 )
 
 
-    # Build the user prompt dynamically from context
-    user_prompt = (
+def _user_prompt(state: State) -> str:
+    return (
         f"Extract all professional work experiences (jobs, internships, research positions) from this text. "
         f"Include ONLY experiences that are explicitly mentioned:\n\n"
         f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
     )
 
-    # Call your LLM wrapper
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Extract all professional work experiences (jobs, internships, research positions) from the text above. "
+    "Include ONLY experiences that are explicitly mentioned."
+)
+
+
+def _result(msg: str) -> dict:
     experience_text = msg.strip() if msg else ""
 
     # Safety fallback
     if not experience_text:
         experience_text = "No professional experience details could be generated."
 
-    # Update state
-    state["experience"] = experience_text
     return {"experience": experience_text}
 
 
+# Nodes
+
+def get_experience(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Node function that queries an LLM to extract or generate
+        a user's work or internship experience in the format:
+        <date>;<position/company>;<explanation>
+
+    🔹 Example output:
+        2023–Present;AI Intern, Akbank;Developing credit-risk analysis models and automating data pipelines.
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'experience' -> formatted string(s)
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="experience",
+                     **shared.prompts(state, "experience", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "experience", msg))
 
 
+async def aget_experience(state: State) -> dict:
+    """Async variant of get_experience, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="experience",
+                            **shared.prompts(state, "experience", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "experience", msg))
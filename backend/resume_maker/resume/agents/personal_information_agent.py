@@ -1,13 +1,10 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
 # Agent for extracting personal information from user input
 
 
-
 class State(TypedDict):
     context:str
     skills:str
@@ -17,28 +14,39 @@ class State(TypedDict):
     personal_info:str
     profile:str
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
 
-
-def get_personal_info(state: State) -> dict:
-    
-    # Build a detailed prompt for clarity and control
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "profile": {
+            "type": "object",
+            "properties": {
+                "name": {"type": ["string", "null"]},
+                "surname": {"type": ["string", "null"]},
+                "position": {"type": ["string", "null"]},
+                "description": {"type": ["string", "null"]},
+                "phone_number": {"type": ["string", "null"]},
+                "accounts": {
+                    "type": "object",
+                    "properties": {
+                        "email": {"type": ["string", "null"]},
+                        "github": {"type": ["string", "null"]},
+                        "linkedin": {"type": ["string", "null"]},
+                    },
+                    "required": ["email", "github", "linkedin"],
+                    "additionalProperties": False,
+                },
+            },
+            "required": ["name", "surname", "position", "description", "phone_number", "accounts"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["profile"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist. Your task is to carefully analyze unstructured text "
     "and extract personal and professional identity information with high precision.\n\n"
 
@@ -46,10 +54,10 @@ def get_personal_info(state: State) -> dict:
     "1. First, scan the entire text for explicit mentions of: names, job titles, contact info, social profiles\n"
     "2. Identify contextual clues that indicate professional focus (e.g., 'I work on...', 'specializing in...')\n"
     "3. Only extract information that is DIRECTLY STATED or STRONGLY IMPLIED by the text\n"
-    "4. If information is ambiguous or missing, OMIT that field entirely from the output\n\n"
+    "4. If information is ambiguous or missing, set that field to null\n\n"
 
     "## OUTPUT FORMAT\n"
-    "Return ONLY a valid JSON object with this structure (omit any field without clear data):\n"
+    "Return ONLY a valid JSON object with this structure (use null for any field without clear data):\n"
     "{\n"
     '  "profile": {\n'
     '    "name": "<first name>",\n'
@@ -73,24 +81,29 @@ def get_personal_info(state: State) -> dict:
     "- For 'description': synthesize ONLY from explicitly mentioned skills, expertise, or goals\n"
     "- Preserve original capitalization for names; use title case for positions\n"
     "- Include only accounts/contact info that are explicitly provided in the text\n"
-    "- If the text contains no extractable personal information, return: {\"profile\": {}}\n"
+    "- If the text contains no extractable personal information, set every field to null\n"
     "- Output must be valid JSON with no markdown formatting, code blocks, or commentary\n"
 )
 
 
+def _user_prompt(state: State) -> str:
+    return (
+        f"Analyze the following text and extract personal/professional identity information. "
+        f"Extract ONLY what is explicitly stated or clearly implied:\n\n"
+        f"---TEXT START---\n{state['context']}\n---TEXT END---"
+    )
+
 
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Analyze the text above and extract personal/professional identity information. "
+    "Extract ONLY what is explicitly stated or clearly implied."
+)
 
-    user_prompt = (
-    f"Analyze the following text and extract personal/professional identity information. "
-    f"Extract ONLY what is explicitly stated or clearly implied:\n\n"
-    f"---TEXT START---\n{state['context']}\n---TEXT END---"
-    )
 
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+def _result(msg: str) -> dict:
     profile_text = msg
 
-    state["personal_info"] = profile_text
-
     # Safety: ensure output isn't empty
     if not profile_text:
         profile_text = f"A concise professional summary for the user could not be generated."
@@ -98,5 +111,27 @@ def get_personal_info(state: State) -> dict:
     return {"personal_info": profile_text}
 
 
+# Nodes
 
-
+def get_personal_info(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Extract personal and professional identity information
+        (name, position, phone, email, GitHub, LinkedIn).
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'personal_info' -> JSON string with a 'profile' object
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="personal_info",
+                     **shared.prompts(state, "personal_info", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "personal_info", msg))
+
+
+async def aget_personal_info(state: State) -> dict:
+    """Async variant of get_personal_info, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="personal_info",
+                            **shared.prompts(state, "personal_info", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "personal_info", msg))
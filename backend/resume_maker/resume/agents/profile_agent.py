@@ -1,11 +1,8 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
-
-
+# Agent for writing the first-person profile summary
 
 
 class State(TypedDict):
@@ -16,43 +13,9 @@ class State(TypedDict):
     references:str
     personal_info:str
     profile:str
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-# Nodes
-
 
 
-def get_profile(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Retrieve or generate professional contact information for a person.
-        Expected to include LinkedIn, GitHub, email, and phone — if available.
-
-    🔹 Expected input:
-        state["name"] : str  → person's full name
-
-    🔹 Returns:
-        dict -> {"personal_info": <string>} containing cleanly formatted info.
-    """
-
-   
-
-    # Clear system instruction for controlled and safe output
-    system_prompt = (
+SYSTEM_PROMPT = (
     "You are an expert professional summary writer. Your task is to synthesize information from text "
     "into a compelling first-person professional profile summary.\n\n"
 
@@ -80,16 +43,24 @@ def get_profile(state: State) -> dict:
     "write a brief, factual statement based only on what IS available\n"
 )
 
-    # User prompt that guides structure and ensures clarity
-    user_prompt = (
+
+def _user_prompt(state: State) -> str:
+    return (
         f"Write a first-person professional summary (2-4 sentences) based on the following text. "
         f"Use ONLY information that is explicitly stated:\n\n"
         f"---TEXT START---\n{state['context']}\n---TEXT END---"
     )
 
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
 
-    personal_info = msg
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Write a first-person professional summary (2-4 sentences) based on the text above. "
+    "Use ONLY information that is explicitly stated."
+)
+
+
+def _result(msg: str) -> dict:
+    personal_info = msg or ""
 
     # Safety: basic cleanup
     personal_info = personal_info.replace("N/A", "").replace("Unknown", "").strip()
@@ -99,4 +70,27 @@ def get_profile(state: State) -> dict:
     return {"profile": personal_info}
 
 
+# Nodes
+
+def get_profile(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Write a first-person professional profile summary
+        from the user's text.
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict -> {"profile": <string>} containing the plain-text summary.
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="profile",
+                     **shared.prompts(state, "profile", _user_prompt(state), SHARED_USER_PROMPT, None))
+    return _result(shared.answer(state, "profile", msg))
+
 
+async def aget_profile(state: State) -> dict:
+    """Async variant of get_profile, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="profile",
+                            **shared.prompts(state, "profile", _user_prompt(state), SHARED_USER_PROMPT, None))
+    return _result(shared.answer(state, "profile", msg))
@@ -1,13 +1,10 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
 # Agent for extracting references from user input
 
 
-
 class State(TypedDict):
     context:str
     skills:str
@@ -17,41 +14,30 @@ class State(TypedDict):
     personal_info:str
     profile:str
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-def get_references(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Node function that queries an LLM to extract or generate
-        a user's professional or academic references in the format:
-        <name>;<relationship/title>;<contact information>
-
-
-    🔹 Expected input:
-        state: dict-like LangGraph State with key 'context' holding user information.
 
-    🔹 Returns:
-        dict with key 'references' -> formatted string(s)
-    """
-
-    name = (state.get("name") or "The user").strip()
-
-    # Define structured and explicit system prompt
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "references": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "relationship_or_title": {"type": "string"},
+                    "contact": {"type": "string"},
+                },
+                "required": ["name", "relationship_or_title", "contact"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["references"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist focused on identifying professional and academic references "
     "from unstructured text. This is a HIGHLY SENSITIVE extraction task - references must NEVER be fabricated.\n\n"
 
@@ -91,17 +77,24 @@ def get_references(state: State) -> dict:
 )
 
 
-
-    # Extract relevant context
-    user_prompt = (
+def _user_prompt(state: State) -> str:
+    return (
         f"Extract ONLY explicitly stated professional or academic references from this text. "
         f"Do NOT treat mentioned colleagues, supervisors, or professors as references unless they are "
         f"EXPLICITLY identified as references:\n\n"
         f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
     )
 
-    # Call the LLM
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Extract ONLY explicitly stated professional or academic references from the text above. "
+    "Do NOT treat mentioned colleagues, supervisors, or professors as references unless they are "
+    "EXPLICITLY identified as references."
+)
+
+
+def _result(msg: str) -> dict:
     references_text = msg.strip() if msg else ""
 
     # Safety fallback if the model fails or returns empty
@@ -110,10 +103,32 @@ def get_references(state: State) -> dict:
             "No professional references could be generated."
         )
 
-    # Update the state
-    state["references"] = references_text
     return {"references": references_text}
 
 
+# Nodes
+
+def get_references(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Node function that queries an LLM to extract or generate
+        a user's professional or academic references in the format:
+        <name>;<relationship/title>;<contact information>
+
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'references' -> formatted string(s)
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="references",
+                     **shared.prompts(state, "references", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "references", msg))
 
 
+async def aget_references(state: State) -> dict:
+    """Async variant of get_references, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="references",
+                            **shared.prompts(state, "references", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "references", msg))
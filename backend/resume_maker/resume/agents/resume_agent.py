@@ -0,0 +1,114 @@
+from ..utils import llm
+from typing_extensions import TypedDict
+from . import (
+    name_agent, personal_information_agent, education_agent,
+    experience_agent, courses_agent, skills_agent, references_agent)
+
+# Agent for extracting every resume section from user input in a single call
+
+
+class State(TypedDict):
+    context: str
+    resume: str
+
+
+# Strict JSON schema for the structured output, composed from the section agents' schemas
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": name_agent.SCHEMA["properties"]["name"],
+        "profile": personal_information_agent.SCHEMA["properties"]["profile"],
+        "summary": {"type": "string"},
+        "education": education_agent.SCHEMA["properties"]["education"],
+        "experience": experience_agent.SCHEMA["properties"]["experience"],
+        "courses_and_certifications": courses_agent.SCHEMA["properties"]["courses_and_certifications"],
+        "skills": skills_agent.SCHEMA["properties"]["skills"],
+        "references": references_agent.SCHEMA["properties"]["references"],
+    },
+    "required": [
+        "name", "profile", "summary", "education", "experience",
+        "courses_and_certifications", "skills", "references",
+    ],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
+    "You are an expert information extraction specialist. Your task is to extract a complete, structured "
+    "resume from unstructured text in ONE pass, with high precision and zero fabrication.\n\n"
+
+    "## EXTRACTION PROCESS\n"
+    "1. Identify the person's full name and their contact details (email, phone, GitHub, LinkedIn)\n"
+    "2. Identify their professional title and focus\n"
+    "3. Extract formal education (degrees, diplomas) - NOT courses or certifications\n"
+    "4. Extract work experience (jobs, internships, research positions), most recent first\n"
+    "5. Extract courses, certifications, workshops and bootcamps\n"
+    "6. Extract and categorize skills (Technical, Tools, Analytical, Soft, Domain, Languages)\n"
+    "7. Extract references ONLY if they are explicitly identified as references\n"
+    "8. Write a 2-4 sentence first-person professional summary\n\n"
+
+    "## OUTPUT FORMAT\n"
+    "Return ONLY a valid JSON object with exactly these keys:\n"
+    "{\n"
+    '  "name": "<Full Name or empty string>",\n'
+    '  "profile": {\n'
+    '    "name": "<first name>",\n'
+    '    "surname": "<last name>",\n'
+    '    "position": "<professional title>",\n'
+    '    "description": "<one sentence about professional focus>",\n'
+    '    "phone_number": "<phone with country code if present>",\n'
+    '    "accounts": {"email": "<email>", "github": "<github URL or username>", "linkedin": "<linkedin URL or username>"}\n'
+    "  },\n"
+    '  "summary": "<2-4 sentence first-person professional summary, plain text>",\n'
+    '  "education": [{"date": "<years>", "education": "<Degree in Field at Institution>", "description": "<first person>"}],\n'
+    '  "experience": [{"date": "<start – end or Present>", "position_or_company": "<Job Title at Company>", "description": "<first person>"}],\n'
+    '  "courses_and_certifications": [{"date": "<year>", "course_or_certificate": "<Name and Issuer>", "description": "<first person>"}],\n'
+    '  "skills": [{"category": "<category>", "skills": ["<skill>"], "explanation": "<first person>"}],\n'
+    '  "references": [{"name": "<Full Name>", "relationship_or_title": "<Title and Organization>", "contact": "<email or phone if given>"}]\n'
+    "}\n\n"
+
+    "## STRICT RULES\n"
+    "- ALWAYS write descriptions, explanations and the summary in FIRST PERSON\n"
+    "- NEVER invent, guess, or hallucinate any information not present in the source text\n"
+    "- NEVER use placeholder values like 'N/A', 'Unknown', 'TBD', or example data from this prompt\n"
+    "- Use null for fields inside 'profile' that are not in the text\n"
+    "- Use [] for any list section with no data, and \"\" for a missing name\n"
+    "- Contact information MUST be taken verbatim from the text\n"
+    "- Output must be valid JSON with no markdown, code blocks, or extra commentary\n"
+)
+
+
+def _user_prompt(state: State) -> str:
+    return (
+        f"Extract the complete resume from this text. "
+        f"Include ONLY information that is explicitly stated or clearly implied:\n\n"
+        f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
+    )
+
+
+def _result(msg: str) -> dict:
+    resume_text = msg.strip() if msg else ""
+    return {"resume": resume_text}
+
+
+# Nodes
+
+def get_resume(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Extract the whole resume schema (name, personal info, summary,
+        education, experience, courses, skills, references) in one LLM call.
+
+    🔹 Expected input:
+        state: dict-like State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'resume' -> JSON string with one key per section
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, user_prompt=_user_prompt(state), agent="resume", schema=SCHEMA)
+    return _result(msg)
+
+
+async def aget_resume(state: State) -> dict:
+    """Async variant of get_resume, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, user_prompt=_user_prompt(state), agent="resume", schema=SCHEMA)
+    return _result(msg)
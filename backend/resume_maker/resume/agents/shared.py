@@ -0,0 +1,149 @@
+import json
+from functools import lru_cache
+from typing import Iterable
+
+from django.conf import settings
+
+from ..utils.providers import CONTEXT_PREAMBLE
+from ..utils.segmenter import approx_tokens
+
+# Prompt layout shared by the section agents, so that every section call for
+# one text starts with the same tokens and the provider's prompt cache serves
+# that prefix once the first call has sent it. The provider reads the
+# structured-output schema before the messages, so all sections answer with
+# the same schema (every section's fields, see schema()); the text goes next
+# (llm.invoke's context), and only each agent's instructions, sent last, differ.
+#
+# The shared schema is several times larger than a section's own, so the layout
+# only pays off when the calls really send the same full text and that prefix
+# is long enough for the provider to cache (worthwhile()). The parser lists the
+# sections that get it in state["shared_sections"]; every other call keeps its
+# own schema and the text inside its instructions.
+
+# Shortest prompt prefix the provider caches, and the step it caches in
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP = 128
+
+# Fields of the shared schema each section fills
+FIELDS = {
+    "name": ("name",),
+    "personal_info": ("profile",),
+    "profile": ("summary",),
+    "education": ("education",),
+    "experience": ("experience",),
+    "courses": ("courses_and_certifications",),
+    "skills": ("skills",),
+    "references": ("references",),
+}
+
+# Sections whose agent answers in plain text (its one field's value)
+TEXT_SECTIONS = ("profile",)
+
+
+@lru_cache(maxsize=None)
+def schema() -> dict:
+    """
+    Strict JSON schema shared by the section agents: the full resume agent's
+    fields, each nullable. A section call fills its own fields and leaves the
+    rest null.
+    """
+    # The resume agent imports every section agent, and they import this module
+    from .resume_agent import SCHEMA
+
+    properties = {
+        key: {"anyOf": [prop, {"type": "null"}]}
+        for key, prop in SCHEMA["properties"].items()
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+@lru_cache(maxsize=None)
+def _own_schema_tokens() -> dict:
+    """Size of each section agent's own schema (0 for plain-text answers)."""
+    from . import (
+        courses_agent, education_agent, experience_agent, name_agent,
+        personal_information_agent, profile_agent, references_agent, skills_agent)
+
+    modules = {
+        "name": name_agent, "personal_info": personal_information_agent, "profile": profile_agent,
+        "education": education_agent, "experience": experience_agent, "courses": courses_agent,
+        "skills": skills_agent, "references": references_agent,
+    }
+    return {
+        section: approx_tokens(json.dumps(module.SCHEMA)) if hasattr(module, "SCHEMA") else 0
+        for section, module in modules.items()
+    }
+
+
+def worthwhile(text: str, sections: Iterable[str]) -> bool:
+    """
+    Whether the shared layout bills fewer input tokens than per-section schemas
+    for these sections, all of which are sent the full `text`. The first call
+    pays the whole shared prefix (schema, preamble, text); the others get its
+    cached part at settings.LLM_CACHED_INPUT_DISCOUNT. The instructions that
+    follow cost the same in both layouts.
+    """
+    sections = list(sections)
+    if len(sections) < 2:
+        return False
+    text_tokens = approx_tokens(text)
+    prefix = approx_tokens(json.dumps(schema())) + approx_tokens(CONTEXT_PREAMBLE) + text_tokens
+    if prefix < CACHE_MIN_TOKENS:
+        return False
+    discount = getattr(settings, "LLM_CACHED_INPUT_DISCOUNT", 0.5)
+    cached = prefix // CACHE_STEP * CACHE_STEP
+    shared_cost = len(sections) * prefix - (len(sections) - 1) * discount * cached
+    own = _own_schema_tokens()
+    own_cost = sum(text_tokens + own.get(section, 0) for section in sections)
+    return shared_cost < own_cost
+
+
+def fields(*keys: str) -> str:
+    """The closing sentence of a section's prompt: which of the shared schema's fields to fill."""
+    names = ", ".join(f'"{key}"' for key in keys)
+    return f"Fill ONLY the {names} field{'s' if len(keys) > 1 else ''} of the JSON answer and set every other field to null."
+
+
+def uses_shared(state: dict, section: str) -> bool:
+    return section in (state.get("shared_sections") or ())
+
+
+def prompts(state: dict, section: str, user_prompt: str, shared_user_prompt: str, own_schema) -> dict:
+    """
+    llm.invoke's prompt arguments for a section call: the shared layout (the
+    text as context, the shared schema) when the parser chose it for this
+    section, otherwise the agent's own prompt (text included) and schema.
+    """
+    if not uses_shared(state, section):
+        return {"user_prompt": user_prompt, "schema": own_schema}
+    return {
+        "user_prompt": f"{shared_user_prompt} {fields(*FIELDS[section])}",
+        "context": state.get("context", ""),
+        "schema": schema(),
+    }
+
+
+def answer(state: dict, section: str, msg: str) -> str:
+    """
+    The answer in the section agent's own format: for the shared layout, its
+    fields as a JSON object string (or the text of its one field for plain-text
+    sections); other answers are returned as they are.
+    """
+    if not uses_shared(state, section):
+        return msg
+    try:
+        data = json.loads(msg)
+    except (TypeError, ValueError):
+        # Left to the parser's repair and validation, like any malformed answer
+        return msg
+    if not isinstance(data, dict):
+        return msg
+    keys = FIELDS[section]
+    if section in TEXT_SECTIONS:
+        return data.get(keys[0]) or ""
+    return json.dumps({key: data.get(key) for key in keys})
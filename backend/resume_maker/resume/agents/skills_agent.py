@@ -1,13 +1,10 @@
-from dotenv import load_dotenv
-import os
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from ..utils import llm
+from . import shared
 from typing_extensions import TypedDict
 
 # Agent for extracting skills from user input
 
 
-
 class State(TypedDict):
     context:str
     skills:str
@@ -17,45 +14,30 @@ class State(TypedDict):
     personal_info:str
     profile:str
 
-# Load environment variables from .env file
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def invoke(system_prompt: str, user_prompt: str):
-    resp = client.responses.create(
-    model="gpt-4o-mini",
-    input=[
-        {"role": "system", "content": f"{system_prompt}"},
-        {"role": "user", "content": f"{user_prompt}"},
-    ],
-     # ensures valid JSON output
-)   
-    
-    return resp.output[0].content[0].text
-# Nodes
-def get_skills(state: State) -> dict:
-    """
-    🔹 Purpose:
-        Node function that queries an LLM to extract or generate
-        a user's key skills in the format:
-        <category>;<skill(s)>;<explanation>
 
-    🔹 Example output:
-        Technical;Python, Django, Docker;Experienced in backend development and deployment pipelines.
-        Soft;Leadership, Communication;Strong collaboration and team coordination skills.
-
-    🔹 Expected input:
-        state: dict-like LangGraph State with key 'context' holding user information.
-
-    🔹 Returns:
-        dict with key 'skills' -> formatted string(s)
-    """
-
-    name = (state.get("name") or "The user").strip()
-
-    # Define a structured and concise system prompt
-    system_prompt = (
+# Strict JSON schema for the structured output (the shape normalize() consumes)
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "skills": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string"},
+                    "skills": {"type": "array", "items": {"type": "string"}},
+                    "explanation": {"type": "string"},
+                },
+                "required": ["category", "skills", "explanation"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["skills"],
+    "additionalProperties": False,
+}
+
+SYSTEM_PROMPT = (
     "You are an expert information extraction specialist focused on identifying professional skills "
     "from unstructured text. Your goal is to extract and categorize skills with high precision.\n\n"
 
@@ -99,15 +81,23 @@ def get_skills(state: State) -> dict:
     "- Output must be valid JSON with no markdown, code blocks, or extra commentary\n"
 )
 
-    # Extract user context for the LLM
-    user_prompt = (
+
+def _user_prompt(state: State) -> str:
+    return (
         f"Extract and categorize all professional skills from this text. "
         f"Include both explicitly mentioned skills and skills clearly demonstrated through described work:\n\n"
         f"---TEXT START---\n{state.get('context', '')}\n---TEXT END---"
     )
 
-    # Call your LLM wrapper
-    msg = invoke(system_prompt=system_prompt, user_prompt=user_prompt)
+
+# Sent after the text in the shared layout, which puts the text first (see shared.py)
+SHARED_USER_PROMPT = (
+    "Extract and categorize all professional skills from the text above. "
+    "Include both explicitly mentioned skills and skills clearly demonstrated through described work."
+)
+
+
+def _result(msg: str) -> dict:
     skills_text = msg.strip() if msg else ""
 
     # Safety fallback
@@ -116,12 +106,35 @@ def get_skills(state: State) -> dict:
             ""
         )
 
-    # Update state
-    state["skills"] = skills_text
     return {"skills": skills_text}
 
 
+# Nodes
 
+def get_skills(state: State) -> dict:
+    """
+    🔹 Purpose:
+        Node function that queries an LLM to extract or generate
+        a user's key skills in the format:
+        <category>;<skill(s)>;<explanation>
 
+    🔹 Example output:
+        Technical;Python, Django, Docker;Experienced in backend development and deployment pipelines.
+        Soft;Leadership, Communication;Strong collaboration and team coordination skills.
+
+    🔹 Expected input:
+        state: dict-like LangGraph State with key 'context' holding user information.
+
+    🔹 Returns:
+        dict with key 'skills' -> formatted string(s)
+    """
+    msg = llm.invoke(system_prompt=SYSTEM_PROMPT, agent="skills",
+                     **shared.prompts(state, "skills", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "skills", msg))
 
 
+async def aget_skills(state: State) -> dict:
+    """Async variant of get_skills, sharing the pooled async client."""
+    msg = await llm.ainvoke(system_prompt=SYSTEM_PROMPT, agent="skills",
+                            **shared.prompts(state, "skills", _user_prompt(state), SHARED_USER_PROMPT, SCHEMA))
+    return _result(shared.answer(state, "skills", msg))
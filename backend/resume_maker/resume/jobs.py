@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import random
+import traceback
+from datetime import timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ResumeJob, ResumeModel, ResumeJson
+from .templates.template import create_pdf_bytes
+from .utils.parser import extract_for_user_async
+from .utils.resilience import ProviderUnavailable
+
+# Database-backed job queue for resume generation.
+# Web processes enqueue jobs; `python manage.py run_resume_worker` claims and runs them.
+
+# Backoff before a job the LLM provider turned away (circuit open, rate limit) runs again
+RETRY_BACKOFF = 30
+MAX_RETRY_BACKOFF = 600
+
+
+def enqueue_job(user, user_input: str, template_name: str, css_name: str) -> ResumeJob:
+    """Create a queued job for the worker pool."""
+    return ResumeJob.objects.create(
+        user=user,
+        user_input=user_input,
+        template_name=template_name,
+        css_name=css_name,
+    )
+
+
+def claim_next_job() -> Optional[ResumeJob]:
+    """
+    Atomically move the oldest queued job to 'running' and return it.
+    The conditional UPDATE makes the claim safe across worker processes
+    on every database backend (no SELECT ... FOR UPDATE needed).
+    """
+    candidate_ids = list(
+        ResumeJob.objects.filter(status='queued')
+        .filter(Q(run_after__isnull=True) | Q(run_after__lte=timezone.now()))
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidate_ids:
+        claimed = ResumeJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ResumeJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(stale_after: float, max_attempts: int) -> int:
+    """
+    Re-queue jobs left 'running' by a worker that died, or fail them
+    once they have used up max_attempts. Returns the number re-queued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = ResumeJob.objects.filter(status='running', started_at__lt=cutoff)
+    stale.filter(attempts__gte=max_attempts).update(
+        status='failed',
+        error='Worker stopped before the job finished',
+        finished_at=timezone.now(),
+    )
+    return stale.filter(attempts__lt=max_attempts).update(status='queued')
+
+
+def _save_result(job: ResumeJob, normalized_data: dict, sections: dict, pdf_bytes: bytes) -> None:
+    ResumeModel.objects.create(user_id=job.user_id, user_input=job.user_input, sections=sections)
+    ResumeJson.objects.create(user_id=job.user_id, json_input=normalized_data)
+    job.status = 'succeeded'
+    job.result = normalized_data
+    job.pdf = pdf_bytes
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'pdf', 'finished_at'])
+
+
+def _requeue(job: ResumeJob, delay: float) -> None:
+    job.status = 'queued'
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=['status', 'run_after'])
+
+
+def _retry_delay(job: ResumeJob, e: ProviderUnavailable) -> float:
+    # Exponential in the attempts so far, never sooner than the provider asked
+    backoff = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (job.attempts - 1))
+    return max(e.retry_after, backoff) + random.uniform(0, RETRY_BACKOFF)
+
+
+def _save_error(job: ResumeJob, error: str) -> None:
+    job.status = 'failed'
+    job.error = error
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+async def run_job(job: ResumeJob, max_attempts: int = 3) -> None:
+    """
+    Parse the job's input, render its PDF and store the outcome on the job.
+    A job the LLM provider is unavailable for goes back to the queue with a
+    backoff, and only fails once it has used up max_attempts.
+    """
+    try:
+        normalized_data, sections = await extract_for_user_async(job.user_id, job.user_input)
+        pdf_bytes = await sync_to_async(create_pdf_bytes, thread_sensitive=False)(
+            normalized_data, job.template_name, job.css_name
+        )
+    except ProviderUnavailable as e:
+        if job.attempts < max_attempts:
+            delay = _retry_delay(job, e)
+            print(f"Resume job {job.id} requeued for {delay:.0f}s: {e}")
+            await sync_to_async(_requeue)(job, delay)
+            return
+        print(f"Resume job {job.id} failed after {job.attempts} attempts: {e}")
+        await sync_to_async(_save_error)(job, str(e))
+        return
+    except Exception as e:
+        print(f"Resume job {job.id} failed: {e}")
+        print(traceback.format_exc())
+        await sync_to_async(_save_error)(job, str(e))
+        return
+    await sync_to_async(_save_result)(job, normalized_data, sections, pdf_bytes)
@@ -0,0 +1,111 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from resume.utils import parser
+
+# Agent answers for each section, as produced by the section agents
+_ENTRY_BUILDERS = {
+    "education": ("education", lambda i: {
+        "date": f"{2000 + i % 20}",
+        "education": f"BSc in Computer Science at University {i}",
+        "description": "I studied algorithms, distributed systems and databases. " * 3,
+    }),
+    "experience": ("experience", lambda i: {
+        "date": f"{2000 + i % 20} – Present",
+        "position_or_company": f"Software Engineer at Company {i}",
+        "description": "I built and operated backend services handling millions of requests. " * 4,
+    }),
+    "courses": ("courses_and_certifications", lambda i: {
+        "date": f"{2000 + i % 20}",
+        "course_or_certificate": f"Cloud Architecture Certificate {i}",
+        "description": "I learned to design resilient cloud systems. " * 2,
+    }),
+    "skills": ("skills", lambda i: {
+        "category": f"Category {i}",
+        "skills": [f"Skill {i}-{j}" for j in range(8)],
+        "explanation": "I use these skills every day. " * 2,
+    }),
+    "references": ("references", lambda i: {
+        "name": f"Reference Person {i}",
+        "relationship_or_title": f"Manager at Company {i}",
+        "contact": f"ref{i}@company{i}.org",
+    }),
+}
+
+
+def _agent_outputs(entries: int) -> dict:
+    outputs = {
+        section: json.dumps({key: [build(i) for i in range(entries)]})
+        for section, (key, build) in _ENTRY_BUILDERS.items()
+    }
+    outputs["name"] = json.dumps({"name": "Jordan Smith"})
+    outputs["personal_info"] = json.dumps({"profile": {
+        "name": "Jordan", "surname": "Smith", "position": "Software Engineer",
+        "description": "I build backend systems.", "phone_number": "+1 415 555 0100",
+        "accounts": {"email": "jordan@smith.dev", "github": "jsmith", "linkedin": "jsmith"},
+    }})
+    outputs["profile"] = "I am a software engineer who builds reliable backend systems."
+    return outputs
+
+
+def _legacy_validate(section: str, output: str, context: str) -> None:
+    """The previous string pipeline: _is_valid_json, then _validate_* loading again and dumping every entry."""
+    if section == "profile":
+        parser._contains_hallucination_markers(output, context)
+        return
+    json.loads(output)
+    data = json.loads(output)
+    for value in data.values():
+        if isinstance(value, list):
+            for entry in value:
+                parser._contains_hallucination_markers(json.dumps(entry), context)
+
+
+def _legacy_normalize(raw: dict) -> dict:
+    # normalize() used to json.loads every section string first
+    return parser.normalize({
+        section: value if section == "profile" else json.loads(value)
+        for section, value in raw.items()
+    })
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark validation and normalization of large synthetic agent outputs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=200,
+                            help="Entries per list section.")
+        parser.add_argument("--repeat", type=int, default=50,
+                            help="Number of timed runs per pipeline.")
+
+    def handle(self, *args, **options):
+        outputs = _agent_outputs(options["entries"])
+        context = "synthetic resume"
+        state = parser._initial_state(context)
+        size = sum(len(value) for value in outputs.values())
+        self.stdout.write(f"{options['entries']} entries per section, {size / 1024:.0f} KiB of agent output")
+
+        def legacy():
+            for section, output in outputs.items():
+                _legacy_validate(section, output, context)
+            _legacy_normalize(outputs)
+
+        def parsed_once():
+            raw = dict(state)
+            for section, output in outputs.items():
+                raw.update(parser._settle(section, output, state, parser.VALIDATORS[section], None))
+            parser.normalize(raw)
+
+        results = {}
+        for label, run in (("strings (before)", legacy), ("parsed objects (after)", parsed_once)):
+            run()  # warm up
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                run()
+            results[label] = (time.perf_counter() - start) / options["repeat"]
+            self.stdout.write(f"{label:<24} {results[label] * 1000:8.2f} ms per resume")
+
+        before, after = results.values()
+        self.stdout.write(f"speedup: {before / after:.2f}x")
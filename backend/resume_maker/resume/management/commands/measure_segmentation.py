@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.utils.parser import SECTIONS
+from resume.utils.segmenter import approx_tokens, segment
+
+
+class Command(BaseCommand):
+    help = "Estimate the prompt tokens input segmentation saves on a corpus of resume texts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+",
+                            help="Text files, or directories of .txt files, with one user input each.")
+
+    def handle(self, *args, **options):
+        files = []
+        for path in map(Path, options["paths"]):
+            files.extend(sorted(path.glob("*.txt")) if path.is_dir() else [path])
+        if not files:
+            raise CommandError("No input files found.")
+
+        total_full = total_sliced = fallbacks = 0
+        for file in files:
+            text = file.read_text(encoding="utf-8")
+            slices = segment(text, SECTIONS)
+            # Every section agent embeds the whole input without segmentation
+            full = approx_tokens(text) * len(SECTIONS)
+            sliced = sum(approx_tokens(s) for s in slices.values())
+            if all(s == text for s in slices.values()):
+                fallbacks += 1
+            total_full += full
+            total_sliced += sliced
+            self.stdout.write(f"{file.name:<40} {full:>7} -> {sliced:>7} tokens ({1 - sliced / full:.0%} less)")
+
+        self.stdout.write(
+            f"{len(files)} inputs, {fallbacks} sent whole: {total_full} -> {total_sliced} context tokens "
+            f"({1 - total_sliced / total_full:.0%} less, approx. 4 chars/token)"
+        )
@@ -0,0 +1,119 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from resume.utils.providers import PrefixCache, canned_answer, canned_usage, prompt_text
+
+
+def _prompts(body: dict):
+    messages = body.get("input") or []
+    if isinstance(messages, str):
+        return "", messages
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    return system, user
+
+
+def _response(body: dict, text: str, usage: dict) -> dict:
+    # The subset of a Responses API object the openai SDK needs to parse it
+    return {
+        "id": f"resp_stub_{random.getrandbits(32):08x}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "stub"),
+        "output": [{
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "total_tokens": usage["input_tokens"] + usage["output_tokens"],
+            "input_tokens_details": {"cached_tokens": usage["cached_tokens"]},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = ("Serve canned, schema-valid answers on an OpenAI-compatible Responses API for offline "
+            "load tests (run with LLM_BASE_URL=http://<host>:<port>/v1).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--latency", type=float, default=0.5,
+                            help="Mean seconds per answer.")
+        parser.add_argument("--jitter", type=float, default=0.0,
+                            help="Answers take latency +/- up to this many seconds.")
+        parser.add_argument("--failure-rate", type=float, default=0.0,
+                            help="Share of requests answered with a 500.")
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                            help="Share of requests answered with a 429 and Retry-After.")
+
+    def handle(self, *args, **options):
+        lock = threading.Lock()
+        served = {"ok": 0, "failed": 0, "limited": 0}
+        prefixes = PrefixCache()
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/responses"):
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                time.sleep(max(0.0, options["latency"] + random.uniform(-options["jitter"], options["jitter"])))
+
+                roll = random.random()
+                if roll < options["rate_limit_rate"]:
+                    outcome = "limited"
+                    self._send(429, {"error": {"message": "Simulated rate limit", "type": "rate_limit"}},
+                               {"retry-after-ms": "500"})
+                elif roll < options["rate_limit_rate"] + options["failure_rate"]:
+                    outcome = "failed"
+                    self._send(500, {"error": {"message": "Simulated provider failure", "type": "server_error"}})
+                else:
+                    outcome = "ok"
+                    system, user = _prompts(body)
+                    schema = (((body.get("text") or {}).get("format") or {}).get("schema"))
+                    text = canned_answer(system, user, schema)
+                    messages = body.get("input") if isinstance(body.get("input"), list) else [{"content": user}]
+                    usage = canned_usage(prompt_text(schema, messages), text, prefixes)
+                    self._send(200, _response(body, text, usage))
+                with lock:
+                    served[outcome] += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options["host"], options["port"]), Handler)
+        self.stdout.write(f"LLM stub listening on http://{options['host']}:{options['port']}/v1 "
+                          f"(latency {options['latency']}s, failure rate {options['failure_rate']:.0%})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served: {served}")
@@ -0,0 +1,56 @@
+import asyncio
+import traceback
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from resume.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run the background worker pool that processes queued resume jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8,
+                            help="Number of jobs processed at the same time.")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--stale-after", type=float, default=600.0,
+                            help="Seconds after which a 'running' job is considered abandoned.")
+        parser.add_argument("--max-attempts", type=int, default=3,
+                            help="Attempts before an abandoned job, or one the LLM provider keeps "
+                                 "turning away, is marked failed.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when the queue is empty instead of polling.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Resume worker started with concurrency={options['concurrency']}")
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        await sync_to_async(requeue_stale_jobs)(options["stale_after"], options["max_attempts"])
+        await asyncio.gather(*[
+            self._worker(options) for _ in range(options["concurrency"])
+        ])
+
+    async def _worker(self, options):
+        while True:
+            # Drop connections past CONN_MAX_AGE or broken (e.g. by a database restart), as a request would
+            await sync_to_async(close_old_connections)()
+            try:
+                job = await sync_to_async(claim_next_job)()
+                if job is None:
+                    if options["once"]:
+                        return
+                    await asyncio.sleep(options["poll_interval"])
+                    await sync_to_async(requeue_stale_jobs)(options["stale_after"], options["max_attempts"])
+                    continue
+                await run_job(job, options["max_attempts"])
+                self.stdout.write(f"Resume job {job.id} finished: {job.status}")
+            except Exception as e:
+                # One failed iteration (database down, ...) must not stop this worker or its siblings
+                # in the gather; a job it left 'running' is picked up by requeue_stale_jobs
+                print(f"Resume worker iteration failed: {e}")
+                print(traceback.format_exc())
+                await asyncio.sleep(options["poll_interval"])
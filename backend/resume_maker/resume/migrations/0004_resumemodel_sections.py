@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0003_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumemodel',
+            name='sections',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0004_resumemodel_sections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMRateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('level', models.FloatField(default=0)),
+                ('refilled_at', models.FloatField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume', '0005_llmratebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumejob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -8,6 +8,8 @@ from django.contrib.auth.models import User
 class ResumeModel(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     user_input = models.TextField()
+    # Parser output per section, reused when the user edits and resubmits their text
+    sections = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"ResumeModel {self.id}"
@@ -19,4 +21,61 @@ class ResumeJson(models.Model):
     json_input = models.JSONField()
 
     def __str__(self):
-        return f"ResumeJson {self.id}"
\ No newline at end of file
+        return f"ResumeJson {self.id}"
+
+#model to queue resume generation for the background worker
+class ResumeJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resume_jobs')
+    user_input = models.TextField()
+    template_name = models.CharField(max_length=100, default='harward_style')
+    css_name = models.CharField(max_length=100, default='harward')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    attempts = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    # Stored in the database because web and worker run in separate containers
+    pdf = models.BinaryField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # A job requeued after a provider outage isn't claimed again before this time
+    run_after = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"ResumeJob {self.id} - {self.status}"
+
+
+#model to cache LLM responses by a hash of (model, system prompt, user prompt)
+class LLMResponseCache(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    latency = models.FloatField(default=0)
+    input_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"LLMResponseCache {self.key[:12]} ({self.model})"
+
+
+#model holding the OpenAI rate limit budget (requests, tokens) shared by every worker process
+class LLMRateBucket(models.Model):
+    name = models.CharField(max_length=20, unique=True)
+    level = models.FloatField(default=0)
+    # Unix time of the last refill (time.time(), comparable across processes)
+    refilled_at = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"LLMRateBucket {self.name} ({self.level:.0f})"
@@ -2,16 +2,17 @@
 from __future__ import annotations
 from pathlib import Path
 import json
+import uuid
 from typing import Any, Dict
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from weasyprint import HTML, CSS
 
-def create_pdf(html_dict: Dict[str, Any], template_name: str, css_name: str) -> Path:
+def create_pdf(html_dict: Dict[str, Any], template_name: str, css_name: str, output_name: str = "resume") -> Path:
     cwd = Path.cwd()
-    # Paths
+    # Paths (use a unique output_name when several renders can run at once)
     html_file = cwd / "resume" / "templates" / f"{template_name}.html"
-    out_html  = cwd / "resume" / "media" / "resume.html"
-    out_pdf   = cwd / "resume" / "media" / "resume.pdf"
+    out_html  = cwd / "resume" / "media" / f"{output_name}.html"
+    out_pdf   = cwd / "resume" / "media" / f"{output_name}.pdf"
 
     css_custom    = cwd / "resume" / "templates" / "assets" / f"{css_name}.css"
 
@@ -44,6 +45,16 @@ def create_pdf(html_dict: Dict[str, Any], template_name: str, css_name: str) ->
     print(f"Built PDF  -> {out_pdf.resolve()}")
     return out_pdf
 
+def create_pdf_bytes(html_dict: Dict[str, Any], template_name: str, css_name: str) -> bytes:
+    """Render a PDF to a one-off file, delete it and return its bytes."""
+    pdf_path = create_pdf(html_dict, template_name=template_name, css_name=css_name,
+                          output_name=f"resume-{uuid.uuid4().hex}")
+    try:
+        return pdf_path.read_bytes()
+    finally:
+        pdf_path.unlink(missing_ok=True)
+        pdf_path.with_suffix(".html").unlink(missing_ok=True)
+
 def main():
     # Load the already-normalized context your template expects
     # (This is the file produced by your normalize/render script)
@@ -1,3 +1,572 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import itertools
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .agents import (
+    courses_agent, education_agent, experience_agent, name_agent,
+    personal_information_agent, profile_agent, references_agent, shared, skills_agent)
+from .management.commands import run_resume_worker
+from .models import LLMRateBucket
+from .utils import (
+    admission, deadline, extractors, hallucination, hedging, json_repair, llm, llm_cache, metrics, parser,
+    providers, ratelimit, resilience, segmenter, singleflight)
+
+# Coordination through an in-memory cache, so these tests need no database
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "coordination": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests"},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES, SINGLEFLIGHT_ENABLED=True)
+class SingleFlightTests(SimpleTestCase):
+
+    async def test_cancelled_waiter_leaves_the_others_their_result(self):
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return {"name": "Ada Lovelace"}
+
+        key = singleflight.make_key("cancelled-waiter")
+        leader = asyncio.create_task(singleflight.coalesce(key, work))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.create_task(singleflight.coalesce(key, work)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await leader, {"name": "Ada Lovelace"})
+        for waiter in waiters[1:]:
+            self.assertEqual(await waiter, {"name": "Ada Lovelace"})
+        with self.assertRaises(asyncio.CancelledError):
+            await waiters[0]
+        self.assertEqual(len(runs), 1)
+
+    @override_settings(PARSER_DEADLINE_SECONDS=0.2)
+    async def test_waiter_gives_up_on_another_process_after_the_deadline(self):
+        key = singleflight.make_key("stuck-leader")
+        # Another process holds the lock and never publishes a result
+        cache = singleflight.caches[singleflight.CACHE_ALIAS]
+        await cache.aadd(f"singleflight:lock:{key}", 1, 60)
+
+        async def work():
+            return "local"
+
+        with mock.patch.object(singleflight, "WAIT_MARGIN", 0.1):
+            start = asyncio.get_running_loop().time()
+            self.assertEqual(await singleflight.coalesce(key, work), "local")
+            waited = asyncio.get_running_loop().time() - start
+        self.assertGreaterEqual(waited, 0.3)
+        self.assertLess(waited, 2)
+        self.assertEqual(singleflight._lock_ttl(), 1)
+
+
+class SharedPrefixTests(SimpleTestCase):
+
+    LONG_TEXT = "I built data pipelines in Python and Go for a logistics company. " * 120
+
+    def test_short_text_keeps_the_section_schemas(self):
+        state = parser._initial_state("I'm Ada. I know Python and Django.")
+        parser._share_prefix(state, list(parser.SECTIONS))
+        self.assertEqual(state["shared_sections"], [])
+
+        with mock.patch.object(skills_agent.llm, "invoke", return_value='{"skills": []}') as invoke:
+            skills_agent.get_skills(parser._agent_state("skills", state))
+        kwargs = invoke.call_args.kwargs
+        self.assertIs(kwargs["schema"], skills_agent.SCHEMA)
+        self.assertNotIn("context", kwargs)
+
+    def test_only_sections_sent_the_full_text_share_it(self):
+        state = parser._initial_state(self.LONG_TEXT)
+        state["slices"] = {"skills": self.LONG_TEXT, "education": "Nothing about school."}
+        parser._share_prefix(state, ["skills", "education", "profile"])
+        self.assertEqual(state["shared_sections"], ["skills", "profile"])
+
+        with mock.patch.object(skills_agent.llm, "invoke", return_value='{"skills": [], "name": null}') as invoke:
+            result = skills_agent.get_skills(parser._agent_state("skills", state))
+        kwargs = invoke.call_args.kwargs
+        self.assertIs(kwargs["schema"], shared.schema())
+        self.assertEqual(kwargs["context"], self.LONG_TEXT)
+        self.assertEqual(result, {"skills": '{"skills": []}'})
+
+
+class StreamMissingTests(SimpleTestCase):
+
+    async def test_done_lists_every_missing_section(self):
+        async def out_of_time(state):
+            raise deadline.DeadlineExceeded()
+
+        agents = [
+            (name_agent, "aget_name"), (personal_information_agent, "aget_personal_info"),
+            (profile_agent, "aget_profile"), (education_agent, "aget_education"),
+            (experience_agent, "aget_experience"), (courses_agent, "aget_courses_certifications"),
+            (skills_agent, "aget_skills"), (references_agent, "aget_references"),
+        ]
+        with contextlib.ExitStack() as stack:
+            for module, agent in agents:
+                stack.enter_context(mock.patch.object(module, agent, out_of_time))
+            # No name or e-mail in the text, so rules fill nothing and every section runs its agent
+            events = [event async for event in parser.stream_resume_input_async("I enjoy long walks.")]
+
+        kind, done = events[-1]
+        self.assertEqual(kind, "done")
+        self.assertEqual(done["missing"], list(parser.SECTIONS))
+
+
+@override_settings(CACHES=LOCAL_CACHES, LLM_PROVIDER="fake", LLM_CACHE_ENABLED=False,
+                   SINGLEFLIGHT_ENABLED=False, LLM_RATE_LIMIT_RPM=0)
+class ExhaustedSectionTests(SimpleTestCase):
+
+    TEXT = (
+        "Hi, I'm Ada Lovelace, a backend engineer based in London.\n\n"
+        "Education\n\nBSc Mathematics, University of London, 2012-2015.\n\n"
+        "Experience\n\nSoftware Engineer at Babbage Ltd, 2016-2019, building payment services in Python."
+    )
+
+    async def test_exhausted_section_is_extracted_again_on_resubmit(self):
+        answers = ['{"education": "not a list"}'] * (parser.MAX_RETRIES + 1) + ['{"education": []}']
+
+        async def education(state):
+            return {"education": answers.pop(0)}
+
+        with mock.patch.object(education_agent, "aget_education", education):
+            _, sections = await parser.reparse_resume_input_async(self.TEXT)
+            # The empty fallback isn't stored as an extraction...
+            self.assertIsNone(sections["education"])
+            self.assertEqual(len(answers), 1)
+
+            # ...so resubmitting the same text extracts it again and reuses the rest
+            _, sections = await parser.reparse_resume_input_async(self.TEXT, self.TEXT, sections)
+        self.assertEqual(answers, [])
+        self.assertEqual(sections["education"], {"education": []})
+
+
+@override_settings(CACHES=LOCAL_CACHES, LLM_PROVIDER="fake", LLM_CACHE_ENABLED=False, SINGLEFLIGHT_ENABLED=False,
+                   LLM_RATE_LIMIT_RPM=0, PARSER_LONG_INPUT_TOKENS=100, PARSER_CHUNK_TOKENS=80,
+                   PARSER_CHUNK_OVERLAP_TOKENS=0)
+class LongInputTests(SimpleTestCase):
+
+    TEXT = "\n\n".join(
+        f"From {2000 + i} to {2001 + i} I worked as an engineer at Company {i}, building services in Python "
+        f"and looking after the databases behind them."
+        for i in range(8)
+    )
+    SKILLS = {"skills": [{"category": "Technical", "skills": ["Python"], "explanation": "I use Python."}]}
+
+    async def _peak_chunks(self, **kwargs):
+        running, peak = [0], [0]
+
+        async def experience(state):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.02)
+            running[0] -= 1
+            return {"experience": '{"experience": []}'}
+
+        async def skills(state):
+            raise AssertionError("reused sections are not extracted")
+
+        with mock.patch.object(experience_agent, "aget_experience", experience), \
+                mock.patch.object(skills_agent, "aget_skills", skills):
+            state = await parser.parse_async(self.TEXT, reuse={"skills": self.SKILLS}, **kwargs)
+        self.assertGreater(len(parser._long_input_chunks(self.TEXT)), 2)
+        self.assertEqual(state["skills"], self.SKILLS)
+        return peak[0]
+
+    async def test_chunks_share_the_concurrency_cap_and_keep_reused_sections(self):
+        self.assertEqual(await self._peak_chunks(max_concurrency=len(parser.SECTIONS)), 1)
+        self.assertEqual(await self._peak_chunks(max_concurrency=2 * len(parser.SECTIONS)), 2)
+
+
+class HedgingTests(SimpleTestCase):
+
+    async def test_hedged_call_records_the_wait_on_the_primary(self):
+        tracker = hedging.LatencyTracker(quantile=0.5, min_samples=1)
+        tracker.observe("agent", 0.05)
+        calls = []
+
+        async def call():
+            calls.append(1)
+            # The primary straggles; the duplicate answers quickly
+            await asyncio.sleep(1 if len(calls) == 1 else 0.01)
+            return len(calls)
+
+        with mock.patch.object(hedging, "HEDGING_ENABLED", True), mock.patch.object(hedging, "tracker", tracker):
+            self.assertEqual(await hedging.hedged("agent", call), 2)
+
+        observed = tracker._samples["agent"][-1]
+        self.assertGreaterEqual(observed, 0.06)
+        self.assertLess(observed, 1)
+
+
+class DeadlineBreakerTests(SimpleTestCase):
+
+    def test_deadline_cut_calls_do_not_open_the_circuit(self):
+        provider = providers.FakeProvider(latency=0.2)
+        breaker = resilience.CircuitBreaker(failure_threshold=2)
+        with mock.patch.object(resilience, "breaker", breaker):
+            for _ in range(4):
+                with deadline.within(deadline.deadline_in(0.02)):
+                    with self.assertRaises(deadline.DeadlineExceeded):
+                        resilience.call(lambda: provider.complete("gpt-4o-mini", "system", "user", None))
+            self.assertEqual(breaker.state, "closed")
+
+            # A healthy call still goes through afterwards
+            provider.latency = 0
+            text, _ = resilience.call(lambda: provider.complete("gpt-4o-mini", "system", "user", None))
+            self.assertTrue(text)
+
+
+class JsonRepairTests(SimpleTestCase):
+
+    def test_code_fence(self):
+        text = 'Here you go:\n```json\n{"name": "Ada Lovelace"}\n```'
+        self.assertEqual(json_repair.repair_json_value(text), {"name": "Ada Lovelace"})
+
+    def test_prose_around_the_object(self):
+        text = 'Sure! {"skills": []} Let me know if you need anything else.'
+        self.assertEqual(json_repair.repair_json_value(text), {"skills": []})
+
+    def test_trailing_comma(self):
+        self.assertEqual(json_repair.repair_json_value('{"education": [1, 2,],}'), {"education": [1, 2]})
+
+    def test_unbalanced_braces_from_truncated_output(self):
+        text = '{"experience": [{"position_or_company": "Babbage Ltd", "description": "Built payment serv'
+        self.assertEqual(json_repair.repair_json_value(text), {
+            "experience": [{"position_or_company": "Babbage Ltd", "description": "Built payment serv"}],
+        })
+
+    def test_dangling_key_is_dropped(self):
+        self.assertEqual(json_repair.repair_json_value('{"name": "Ada", "summary": '), {"name": "Ada"})
+
+    def test_python_style_dict_via_literal_eval(self):
+        text = "{'name': 'Ada', 'accounts': None, 'active': True}"
+        self.assertEqual(json_repair.repair_json_value(text), {"name": "Ada", "accounts": None, "active": True})
+
+    def test_literal_eval_skipped_above_the_size_cap(self):
+        padding = "x" * json_repair._MAX_LITERAL_EVAL
+        self.assertIsNone(json_repair.repair_json_value("{'name': '" + padding + "'}"))
+        # The same shape under the cap is repaired
+        self.assertEqual(json_repair.repair_json_value("{'name': 'x'}"), {"name": "x"})
+
+    def test_unrepairable_text(self):
+        self.assertIsNone(json_repair.repair_json_value("I could not find any education."))
+        self.assertIsNone(json_repair.repair_json_value('"just a string"'))
+        self.assertIsNone(json_repair.repair_json(""))
+
+    def test_repair_json_returns_valid_json(self):
+        self.assertEqual(json_repair.repair_json("```json\n{'skills': [],}\n```"), '{"skills": []}')
+
+
+class GroundingTests(SimpleTestCase):
+
+    CONTEXT = (
+        "I'm Zoë Ångström, a data engineer. Reach me at zoe@angstrom.dev or +44 20 7946 0958, "
+        "github.com/zangstrom. References: Prof. Alan Turing (alan@turing.ac.uk)."
+    )
+
+    def test_grounded_name_is_kept_and_invented_one_dropped(self):
+        # Case and accents don't matter
+        self.assertEqual(parser._ground("name", {"name": "zoe angstrom"}, self.CONTEXT), {"name": "zoe angstrom"})
+        self.assertEqual(parser._ground("name", {"name": "John Smith"}, self.CONTEXT), {"name": ""})
+
+    def test_contacts_only_kept_when_in_the_text(self):
+        info = {"profile": {
+            "name": "Zoë", "surname": "Doe", "phone_number": "20 7946 0958",
+            "accounts": {"email": "zoe@angstrom.dev", "github": "https://github.com/zangstrom",
+                         "linkedin": "linkedin.com/in/zoe-a"},
+        }}
+        profile = parser._ground("personal_info", info, self.CONTEXT)["profile"]
+        self.assertEqual(profile["name"], "Zoë")
+        self.assertIsNone(profile["surname"])
+        self.assertEqual(profile["phone_number"], "20 7946 0958")
+        self.assertEqual(profile["accounts"]["email"], "zoe@angstrom.dev")
+        self.assertEqual(profile["accounts"]["github"], "https://github.com/zangstrom")
+        self.assertIsNone(profile["accounts"]["linkedin"])
+
+        profile = parser._ground("personal_info", {"profile": {"accounts": {"email": "zoe@example.com"}}},
+                                 self.CONTEXT)["profile"]
+        self.assertIsNone(profile["accounts"]["email"])
+
+    def test_invented_reference_is_dropped(self):
+        references = {"references": [
+            {"name": "Alan Turing", "contact": "alan@turing.ac.uk"},
+            {"name": "Grace Hopper", "contact": "grace@navy.mil"},
+        ]}
+        self.assertEqual(parser._ground("references", references, self.CONTEXT),
+                         {"references": [{"name": "Alan Turing", "contact": "alan@turing.ac.uk"}]})
+
+    def test_markers_the_user_wrote_are_not_flagged(self):
+        detector = hallucination.HallucinationDetector()
+        self.assertTrue(detector.has_markers("john.doe@example.com", self.CONTEXT))
+        self.assertFalse(detector.has_markers("ops@example.com", "I run ops@example.com for my team."))
+
+
+class RuleExtractionTests(SimpleTestCase):
+
+    def test_name_patterns(self):
+        self.assertEqual(extractors.extract_name("Hello! My name is Ada Lovelace."), ("Ada Lovelace", 0.8))
+        # A self-introduction alone is less certain...
+        self.assertEqual(extractors.extract_name("I'm Ada Lovelace, a backend engineer."), ("Ada Lovelace", 0.6))
+        # ...unless the e-mail agrees
+        name, confidence = extractors.extract_name("I'm Ada Lovelace, ada@lovelace.dev")
+        self.assertEqual(name, "Ada Lovelace")
+        self.assertAlmostEqual(confidence, 0.9)
+        # A single word is halved
+        self.assertEqual(extractors.extract_name("My name is Ada."), ("Ada", 0.4))
+
+    def test_phrases_that_are_not_names(self):
+        self.assertEqual(extractors.extract_name("I am a Senior Engineer at Babbage Ltd."), (None, 0.0))
+        self.assertEqual(extractors.extract_name("I'm Currently looking for work."), (None, 0.0))
+        self.assertEqual(extractors.extract_name("i love building Python services."), (None, 0.0))
+
+    def test_contacts(self):
+        contacts = extractors.extract_contacts(
+            "Email ada@lovelace.dev, phone +44 20 7946 0958, github.com/ada, "
+            "https://www.linkedin.com/in/ada-lovelace/. Worked there 2016 - 2019."
+        )
+        self.assertEqual(contacts, {
+            "email": "ada@lovelace.dev", "phone": "+44 20 7946 0958", "github": "github.com/ada",
+            "linkedin": "linkedin.com/in/ada-lovelace", "location": None,
+        })
+
+    def test_years_and_short_numbers_are_not_phones(self):
+        contacts = extractors.extract_contacts("From 2016 - 2019 at Babbage, then 2019-2024. Room 12 34.")
+        self.assertIsNone(contacts["phone"])
+        self.assertEqual(set(contacts.values()), {None})
+
+    def test_confident_name_and_email_skip_both_agents(self):
+        state = parser._initial_state("My name is Ada Lovelace. Email ada@lovelace.dev, phone +44 20 7946 0958.")
+        self.assertEqual(set(parser._apply_rules(state)), {"name", "personal_info"})
+        self.assertEqual(state["name"], {"name": "Ada Lovelace"})
+        profile = state["personal_info"]["profile"]
+        self.assertEqual((profile["name"], profile["surname"]), ("Ada", "Lovelace"))
+        self.assertEqual(profile["phone_number"], "+44 20 7946 0958")
+        self.assertEqual(profile["accounts"]["email"], "ada@lovelace.dev")
+
+    def test_without_an_email_personal_info_is_left_to_its_agent(self):
+        state = parser._initial_state("My name is Ada Lovelace and I build payment services.")
+        self.assertEqual(parser._apply_rules(state), {"name": {"name": "Ada Lovelace"}})
+        self.assertNotIn("personal_info", state)
+
+    def test_below_the_confidence_threshold_both_agents_run(self):
+        state = parser._initial_state("I'm Ada Lovelace, a backend engineer. Email me at hello@babbage.io.")
+        self.assertLess(extractors.extract_name(state["context"])[1], parser.RULE_MIN_CONFIDENCE)
+        self.assertEqual(parser._apply_rules(state), {})
+        self.assertNotIn("name", state)
+        self.assertNotIn("personal_info", state)
+
+    @override_settings(PARSER_RULE_EXTRACTION=False)
+    def test_rules_can_be_turned_off(self):
+        self.assertEqual(parser._rule_based_sections("My name is Ada Lovelace, ada@lovelace.dev"), {})
+
+
+class SegmenterTests(SimpleTestCase):
+
+    SECTIONS = ("name", "education", "experience", "courses", "references", "profile")
+
+    def test_headed_resume_is_routed_by_section(self):
+        text = (
+            "Ada Lovelace, London.\n\n"
+            "EDUCATION\n\nBSc Mathematics, University of London.\n\n"
+            "EXPERIENCE\n\nSoftware Engineer at Babbage Ltd, building payment services.\n\n"
+            "REFERENCES\n\nCharles Babbage, available on request."
+        )
+        slices = segmenter.segment(text, self.SECTIONS)
+        # Every agent gets the header (who the person is)
+        self.assertEqual(slices["name"], "Ada Lovelace, London.")
+        self.assertEqual(slices["education"], "Ada Lovelace, London.\n\nEDUCATION\n\nBSc Mathematics, University of London.")
+        self.assertIn("Babbage Ltd", slices["experience"])
+        self.assertNotIn("University", slices["experience"])
+        self.assertEqual(slices["references"],
+                         "Ada Lovelace, London.\n\nREFERENCES\n\nCharles Babbage, available on request.")
+        self.assertEqual(slices["courses"], "Ada Lovelace, London.")
+        self.assertEqual(slices["profile"], text)
+
+    def test_unrouted_paragraphs_go_to_every_section(self):
+        text = "Education: BSc Mathematics, University of London, with a thesis on numerical methods.\n\nHello there."
+        slices = segmenter.segment(text, ("education", "courses"))
+        self.assertEqual(slices["courses"], text)
+        self.assertEqual(slices["education"], text)
+
+    def test_mostly_unroutable_text_falls_back_to_the_full_text(self):
+        text = (
+            "Hello there, friend.\n\n"
+            "I like long walks on the beach and quiet evenings with a book.\n\n"
+            "My cat is called Biscuit and she is very fluffy. Also a degree."
+        )
+        self.assertEqual(segmenter.segment(text, ("education", "skills")), {"education": text, "skills": text})
+        self.assertEqual(segmenter.segment("One paragraph only.", ("skills",)), {"skills": "One paragraph only."})
+
+
+@override_settings(LLM_RATE_LIMIT_RPM=600, LLM_RATE_LIMIT_TPM=60000, LLM_RATE_LIMIT_MAX_WAIT=10)
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        ratelimit.reset()
+        self.addCleanup(ratelimit.reset)
+
+    def _levels(self):
+        return {b.name: b.level for b in LLMRateBucket.objects.all()}
+
+    def test_first_call_leases_a_share_of_the_budget(self):
+        ratelimit.acquire(100)
+        # 5% of each bucket moved into this process, one request and 100 tokens spent from it
+        levels = self._levels()
+        self.assertAlmostEqual(levels["requests"], 570, delta=1)
+        self.assertAlmostEqual(levels["tokens"], 57000, delta=100)
+        self.assertEqual(ratelimit._local, {"requests": 29.0, "tokens": 2900.0})
+
+        # Later calls are served from the lease without touching the buckets
+        ratelimit.acquire(100)
+        self.assertEqual(self._levels(), levels)
+        self.assertEqual(ratelimit._local, {"requests": 28.0, "tokens": 2800.0})
+
+    def test_buckets_refill_with_time(self):
+        # Drained six seconds ago: 600 rpm refills 60 requests in that time
+        LLMRateBucket.objects.create(name="requests", level=0, refilled_at=time.time() - 6)
+        LLMRateBucket.objects.create(name="tokens", level=60000, refilled_at=time.time())
+        ratelimit.acquire(100)
+        self.assertAlmostEqual(self._levels()["requests"], 30, delta=1)
+
+    @override_settings(LLM_RATE_LIMIT_RPM=6)
+    def test_call_that_would_wait_too_long_is_refused(self):
+        LLMRateBucket.objects.create(name="requests", level=0, refilled_at=time.time())
+        # 6 rpm: the next request is 10 s away, past the 1 s the call may wait
+        with override_settings(LLM_RATE_LIMIT_MAX_WAIT=1), self.assertRaises(ratelimit.RateLimitBusy):
+            ratelimit.acquire(100)
+        # A request's deadline also bounds the wait
+        with deadline.within(deadline.deadline_in(5)), self.assertRaises(deadline.DeadlineExceeded):
+            ratelimit.acquire(100)
+
+    @override_settings(LLM_RATE_LIMIT_RPM=0)
+    def test_disabled_without_limits(self):
+        ratelimit.acquire(100)
+        self.assertFalse(LLMRateBucket.objects.exists())
+
+
+@override_settings(CACHES=LOCAL_CACHES, ADMISSION_TEST_CONCURRENCY=1, ADMISSION_TEST_QUEUE=1,
+                   ADMISSION_INSTANCE_TEST_CONCURRENCY=1, ADMISSION_QUEUE_TIMEOUT=0.2)
+class AdmissionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.gate = admission.Gate("test")
+
+    async def _hold(self, entered: asyncio.Event, release: asyncio.Event):
+        async with self.gate.admit():
+            entered.set()
+            await release.wait()
+
+    async def test_queue_is_bounded(self):
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold(entered, release))
+        await entered.wait()
+        queued = asyncio.create_task(self._hold(asyncio.Event(), release))
+        await asyncio.sleep(0)
+
+        # One running and one queued: the next is turned away without waiting
+        with self.assertRaises(admission.Overloaded) as cm:
+            async with self.gate.admit():
+                pass
+        self.assertGreater(cm.exception.retry_after, 0)
+
+        release.set()
+        await asyncio.gather(holder, queued)
+        self.assertEqual(self.gate._admitted, 0)
+
+    async def test_queued_call_times_out(self):
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold(entered, release))
+        await entered.wait()
+        with self.assertRaises(admission.Overloaded):
+            async with self.gate.admit():
+                pass
+        self.assertEqual(self.gate._admitted, 1)
+        release.set()
+        await holder
+
+    async def test_cancelled_calls_release_their_slots(self):
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold(entered, release))
+        await entered.wait()
+        queued = asyncio.create_task(self._hold(asyncio.Event(), release))
+        await asyncio.sleep(0)
+
+        # The client goes away, both while running and while queued
+        holder.cancel()
+        queued.cancel()
+        await asyncio.gather(holder, queued, return_exceptions=True)
+        self.assertEqual(self.gate._admitted, 0)
+
+        # The process and instance slots are free again
+        async with self.gate.admit():
+            self.assertEqual(self.gate._admitted, 1)
+
+
+class ResumeWorkerTests(SimpleTestCase):
+
+    async def test_worker_survives_a_database_error(self):
+        claims, closes = [], []
+
+        def claim():
+            claims.append(1)
+            if len(claims) == 1:
+                raise OperationalError("server closed the connection unexpectedly")
+            return None
+
+        options = {"once": True, "poll_interval": 0.01, "stale_after": 600, "max_attempts": 3}
+        with mock.patch.object(run_resume_worker, "claim_next_job", claim), \
+                mock.patch.object(run_resume_worker, "close_old_connections", lambda: closes.append(1)), \
+                contextlib.redirect_stdout(io.StringIO()):
+            await run_resume_worker.Command()._worker(options)
+        # Retried after the error, with stale connections dropped before every claim
+        self.assertEqual(len(claims), 2)
+        self.assertEqual(len(closes), 2)
+
+
+@override_settings(LLM_MODELS={"skills": ["gpt-4o-mini", "gpt-4o"]})
+class CascadeTests(SimpleTestCase):
+
+    def test_only_retries_that_change_the_model_count_as_escalations(self):
+        metrics.reset()
+        models = []
+        for retry in range(3):
+            with llm.escalate(retry):
+                models.append(llm.model_for("skills"))
+
+        self.assertEqual(models, ["gpt-4o-mini", "gpt-4o", "gpt-4o"])
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot.get("llm.cascade.escalated.skills"), 1)
+        self.assertEqual(snapshot.get("llm.cascade.capped.skills"), 1)
+
+
+class ResponseCacheEvictionTests(SimpleTestCase):
+
+    def test_eviction_runs_every_n_writes_across_threads(self):
+        evictions = []
+
+        def write():
+            for _ in range(500):
+                llm_cache._set("key", "gpt-4o-mini", "{}", 0.1, 10, 10)
+
+        with mock.patch.object(llm_cache, "LLMResponseCache"), \
+                mock.patch.object(llm_cache, "_writes", itertools.count(1)), \
+                mock.patch.object(llm_cache, "evict", lambda: evictions.append(1)):
+            threads = [threading.Thread(target=write) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(evictions), 8 * 500 // llm_cache.EVICT_EVERY)
@@ -6,6 +6,11 @@ from . import views
 urlpatterns = [
     path('get_resume/', views.ResumeView.as_view(), name='get_resume'),
     path('get_json/', views.ResumeJsonView.as_view(), name='get_json'),
+    path('stream_json/', views.ResumeJsonStreamView.as_view(), name='stream_json'),
     path('get_pdf_from_json/', views.ResumePdfFromJsonView.as_view(), name='get_pdf_from_json'),
     path('get_data/', views.ResumeDataView.as_view(), name='get_data'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('jobs/', views.ResumeJobView.as_view(), name='create_job'),
+    path('jobs/<int:job_id>/', views.ResumeJobStatusView.as_view(), name='job_status'),
+    path('jobs/<int:job_id>/pdf/', views.ResumeJobPdfView.as_view(), name='job_pdf'),
 ]
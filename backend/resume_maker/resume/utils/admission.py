@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+from . import metrics
+
+# Admission control for the expensive endpoints. Each kind of work (LLM
+# pipelines, PDF renders) passes a gate that bounds how many run at once in
+# this process and across the worker processes of this instance; a few more
+# may queue, and anything beyond that is turned away with 503 + Retry-After
+# so a burst can't tie up every worker (and starve /health/).
+
+CACHE_ALIAS = "coordination"
+
+# Instance slots expire after this long, in case a worker dies holding one
+SLOT_TTL = 300
+
+# Slot keys are per host: every container of the app shares the coordination cache
+_HOST = socket.gethostname()
+
+
+class Overloaded(Exception):
+    """Too much work of this kind is already running or queued here."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Server busy, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Gate:
+    """
+    Bounds concurrent work of one kind. Settings:
+    ADMISSION_<NAME>_CONCURRENCY running per process, ADMISSION_<NAME>_QUEUE waiting
+    per process, ADMISSION_INSTANCE_<NAME>_CONCURRENCY running per instance (0 = no limit).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._admitted = 0
+        # asyncio primitives are bound to their event loop (one per worker process)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _setting(self, suffix: str, default):
+        return getattr(settings, f"ADMISSION_{suffix}", default)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self._setting(f"{self.name.upper()}_CONCURRENCY", 8)
+            )
+        return semaphore
+
+    def _reject(self, reason: str) -> Overloaded:
+        metrics.incr(f"admission.{self.name}.rejected.{reason}")
+        retry_after = self._setting("RETRY_AFTER", 5)
+        return Overloaded(retry_after + random.uniform(0, retry_after))
+
+    @asynccontextmanager
+    async def admit(self):
+        """Run the block once admitted; raises Overloaded when the queue is full or waits too long."""
+        limit = self._setting(f"{self.name.upper()}_CONCURRENCY", 8)
+        queue = self._setting(f"{self.name.upper()}_QUEUE", 16)
+        with self._lock:
+            if self._admitted >= limit + queue:
+                raise self._reject("queue_full")
+            self._admitted += 1
+        try:
+            semaphore = self._semaphore()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self._setting("QUEUE_TIMEOUT", 10))
+            except asyncio.TimeoutError:
+                raise self._reject("queue_timeout")
+            try:
+                slot = await self._take_slot()
+                try:
+                    metrics.incr(f"admission.{self.name}.admitted")
+                    yield
+                finally:
+                    await self._free_slot(slot)
+            finally:
+                semaphore.release()
+        finally:
+            with self._lock:
+                self._admitted -= 1
+
+    async def _take_slot(self) -> Optional[str]:
+        """Claim one of the instance's slots; raises Overloaded when every slot is taken."""
+        slots = self._setting(f"INSTANCE_{self.name.upper()}_CONCURRENCY", 0)
+        if not slots:
+            return None
+        cache = caches[CACHE_ALIAS]
+        # Start at a random slot so concurrent callers don't all race for the first one
+        start = random.randrange(slots)
+        # Coordination is best effort: a cache error never fails the request
+        try:
+            for i in range(slots):
+                key = f"admission:{_HOST}:{self.name}:{(start + i) % slots}"
+                if await cache.aadd(key, 1, SLOT_TTL):
+                    return key
+        except DatabaseError as e:
+            print(f"Admission slot lookup failed: {e}")
+            metrics.incr("admission.error")
+            return None
+        raise self._reject("instance_full")
+
+    async def _free_slot(self, key: Optional[str]) -> None:
+        if key is None:
+            return
+        try:
+            await caches[CACHE_ALIAS].adelete(key)
+        except DatabaseError as e:
+            print(f"Admission slot release failed: {e}")
+
+
+llm_gate = Gate("llm")
+pdf_gate = Gate("pdf")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from .segmenter import approx_tokens, split_segments
+
+# Map-reduce support for very long inputs (10+ page CVs, LinkedIn exports).
+# The text is split into overlapping chunks on paragraph boundaries, the list
+# sections are extracted from every chunk concurrently, and the per-chunk
+# results are merged here before normalize().
+
+# Section key -> (list key inside the agent output, fields identifying one entry)
+LIST_SECTIONS = {
+    "education": ("education", ("education", "date")),
+    "experience": ("experience", ("position_or_company", "date")),
+    "courses": ("courses_and_certifications", ("course_or_certificate", "date")),
+    "references": ("references", ("name",)),
+    "skills": ("skills", ("category",)),
+}
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def split_chunks(text: str, chunk_tokens: int, overlap_tokens: int) -> List[str]:
+    """
+    Split text into chunks of about chunk_tokens, each starting with the last
+    overlap_tokens of the previous one so entries cut at a boundary are seen whole.
+    """
+    pieces = []
+    for segment in split_segments(text):
+        # A single paragraph larger than a chunk is cut by characters
+        limit = chunk_tokens * 4
+        pieces.extend(segment[i:i + limit] for i in range(0, len(segment), limit))
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        tokens = approx_tokens(piece)
+        if current and size + tokens > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                overlap_size += approx_tokens(previous)
+                if overlap_size > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+            current, size = overlap, sum(approx_tokens(p) for p in overlap)
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _key(entry: Dict[str, Any], fields: Iterable[str]) -> tuple:
+    return tuple(_NON_ALNUM.sub("", str(entry.get(field) or "").lower()) for field in fields)
+
+
+def _size(entry: Dict[str, Any]) -> int:
+    return sum(len(str(v)) for v in entry.values() if v)
+
+
+def _richer(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    # The same entry seen in two chunks: keep the more complete one
+    return b if _size(b) > _size(a) else a
+
+
+def _merge_skills(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for group in groups:
+        key = _key(group, ("category",))
+        if key not in merged:
+            merged[key] = {**group, "skills": []}
+        target = merged[key]
+        seen = {str(s).lower() for s in target["skills"]}
+        for skill in group.get("skills") or []:
+            if str(skill).lower() not in seen:
+                seen.add(str(skill).lower())
+                target["skills"].append(skill)
+        if not target.get("explanation") and group.get("explanation"):
+            target["explanation"] = group["explanation"]
+    return list(merged.values())
+
+
+def merge_list_section(section: str, values: List[Any]) -> Optional[Dict[str, Any]]:
+    """Merge one list section's outputs from several chunks, dropping duplicates."""
+    list_key, fields = LIST_SECTIONS[section]
+    entries = []
+    for value in values:
+        if isinstance(value, dict) and isinstance(value.get(list_key), list):
+            entries.extend(e for e in value[list_key] if isinstance(e, dict))
+    if not entries and not any(isinstance(v, dict) for v in values):
+        return None
+
+    if section == "skills":
+        return {list_key: _merge_skills(entries)}
+
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for entry in entries:
+        key = _key(entry, fields)
+        merged[key] = _richer(merged[key], entry) if key in merged else entry
+    return {list_key: list(merged.values())}
+
+
+def merge_states(states: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-chunk parser states. The first chunk's state provides the
+    header sections (name, personal_info, profile); list sections are merged.
+    """
+    merged = dict(states[0])
+    for section in LIST_SECTIONS:
+        merged[section] = merge_list_section(section, [s.get(section) for s in states])
+    return merged
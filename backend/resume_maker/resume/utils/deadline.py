@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Per-request time budget. The parser stores an absolute deadline (time.monotonic())
+# in the graph state and activates it around every agent call; the LLM gateway
+# reads it to size its HTTP timeout and refuses calls once it has passed.
+
+_deadline = contextvars.ContextVar("parser_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the call could finish."""
+
+
+def deadline_in(seconds: Optional[float]) -> Optional[float]:
+    """Absolute deadline `seconds` from now (None or <= 0 means no deadline)."""
+    if not seconds or seconds <= 0:
+        return None
+    return time.monotonic() + seconds
+
+
+@contextmanager
+def within(deadline_at: Optional[float]):
+    """Apply deadline_at (or no deadline) to the calls made inside this block."""
+    token = _deadline.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the active deadline, or None without one."""
+    deadline_at = _deadline.get()
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+
+def timeout(default: float) -> float:
+    """HTTP timeout for the next call: the remaining budget, capped at default."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(default, left)
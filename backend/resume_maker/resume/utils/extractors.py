@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Optional, Tuple
+
+# Rule-based extraction of the resume header (name and contact details).
+# Most inputs state these in a recognisable form ("I'm Ada Lovelace",
+# "ada@lovelace.dev", "github.com/ada"), so the parser can fill them without
+# calling the name and personal_info agents.
+
+_NAME_WORD = r"[A-ZÀ-Þ][\w'’-]+"
+_NAME = rf"({_NAME_WORD}(?:[ \t]+{_NAME_WORD}){{0,3}})"
+
+# (pattern, base confidence): an explicit "my name is" beats a self-introduction
+_NAME_PATTERNS = (
+    (re.compile(rf"(?i:\bmy name is|\bname\s*:)[ \t]+{_NAME}"), 0.8),
+    (re.compile(rf"(?i:\bi['’]m|\bi am|\bthis is)[ \t]+{_NAME}"), 0.6),
+)
+
+# Capitalised words that follow "I'm"/"I am" without being a name
+_NOT_NAMES = frozenset({
+    "a", "an", "the", "currently", "based", "looking", "excited", "passionate",
+    "interested", "experienced", "senior", "junior", "lead", "student", "graduate",
+    "working", "from", "in", "at", "with", "and", "software", "data", "full",
+})
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{1,4}\)[\s.-]?)?\d{2,4}(?:[\s.-]\d{2,4}){1,4}(?![\w/])")
+_YEAR_RANGE = re.compile(r"^(?:19|20)\d\d(?:\s*[-–.]\s*(?:19|20)\d\d)*$")
+_GITHUB = re.compile(r"(?i)\bgithub\.com/([A-Za-z0-9](?:[A-Za-z0-9-]{0,38}))\b")
+_LINKEDIN = re.compile(r"(?i)\blinkedin\.com/in/([\w-]+)")
+
+# Phone numbers have 7 to 15 digits (E.164)
+_MIN_PHONE_DIGITS, _MAX_PHONE_DIGITS = 7, 15
+
+
+def _phone(text: str) -> Optional[str]:
+    for match in _PHONE.finditer(text):
+        candidate = match.group(0).strip()
+        digits = re.sub(r"\D", "", candidate)
+        if not _MIN_PHONE_DIGITS <= len(digits) <= _MAX_PHONE_DIGITS:
+            continue
+        # "2019 - 2021" and similar date ranges
+        if _YEAR_RANGE.match(candidate):
+            continue
+        return candidate
+    return None
+
+
+def extract_contacts(text: str) -> Dict[str, Optional[str]]:
+    """Contact details found in the text, in the shape parser._build_contacts() returns."""
+    text = text or ""
+    email = _EMAIL.search(text)
+    github = _GITHUB.search(text)
+    linkedin = _LINKEDIN.search(text)
+    return {
+        "email": email.group(0) if email else None,
+        "phone": _phone(text),
+        "github": f"github.com/{github.group(1)}" if github else None,
+        "linkedin": f"linkedin.com/in/{linkedin.group(1)}" if linkedin else None,
+        "location": None,
+    }
+
+
+def extract_name(text: str, contacts: Optional[Dict[str, Optional[str]]] = None) -> Tuple[Optional[str], float]:
+    """
+    Return (full name, confidence in [0, 1]) or (None, 0.0).
+    A name whose words also appear in the e-mail address or profile handles
+    is much more likely to be right, and gets a higher confidence.
+    """
+    text = text or ""
+    contacts = contacts if contacts is not None else extract_contacts(text)
+    for pattern, confidence in _NAME_PATTERNS:
+        for match in pattern.finditer(text):
+            words = match.group(1).split()
+            # Trim trailing words that start the next sentence ("I'm Ada Lovelace And ...")
+            while words and words[-1].lower() in _NOT_NAMES:
+                words.pop()
+            if not words or words[0].lower() in _NOT_NAMES:
+                continue
+
+            handles = " ".join(v.lower() for v in contacts.values() if v)
+            if any(len(w) > 2 and w.lower() in handles for w in words):
+                confidence += 0.3
+            if len(words) == 1:
+                confidence /= 2
+            return " ".join(words), min(confidence, 1.0)
+    return None, 0.0
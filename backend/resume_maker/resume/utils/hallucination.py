@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+# Local hallucination checks for agent output.
+# Marker patterns catch template/placeholder data; grounding checks verify that
+# contact details and names in the output actually occur in the user's text.
+# Both run against a per-context index that is built once per input text.
+
+MARKER_PATTERNS: Tuple[str, ...] = (
+    r'\bexample\.com\b',
+    r'\bjohn\.doe\b',
+    r'\bjane\.doe\b',
+    r'\btest@test\b',
+    r'\bplaceholder\b',
+    r'\blorem ipsum\b',
+    r'\bxxx\b',
+    r'\b123-456-7890\b',
+    r'\b555-\d{4}\b',  # Fake phone numbers
+)
+
+_WORD = re.compile(r"\w+")
+_HANDLE = re.compile(r"[\w.-]+")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+_URL = re.compile(r"(?:https?://)?(?:www\.)?[\w-]+(?:\.[\w-]+)+(?:/[\w./%-]*)?")
+_NON_DIGIT = re.compile(r"\D")
+
+# Phone numbers shorter than this are too ambiguous to match on digits
+_MIN_PHONE_DIGITS = 7
+
+
+def _fold(text: str) -> str:
+    """Case- and accent-insensitive form used on both sides of every comparison."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _url_key(url: str) -> str:
+    url = _fold(url).strip()
+    url = re.sub(r"^https?://", "", url)
+    url = re.sub(r"^www\.", "", url)
+    return url.rstrip("/.")
+
+
+class ContextIndex:
+    """Token, e-mail, phone and URL sets of one user input."""
+
+    def __init__(self, context: str):
+        self.text = _fold(context or "")
+        self.words = frozenset(_WORD.findall(self.text))
+        self.handles = frozenset(h.strip(".-") for h in _HANDLE.findall(self.text))
+        self.emails = frozenset(_EMAIL.findall(self.text))
+        self.phones = frozenset(
+            digits for digits in (_NON_DIGIT.sub("", p) for p in _PHONE.findall(self.text))
+            if len(digits) >= _MIN_PHONE_DIGITS
+        )
+        self.urls = frozenset(_url_key(u) for u in _URL.findall(self.text))
+
+
+@lru_cache(maxsize=64)
+def _index(context: str) -> ContextIndex:
+    return ContextIndex(context)
+
+
+class HallucinationDetector:
+    """
+    Marker and grounding checks, compiled once.
+    Every check takes the user's text as `context`; its index (and the markers
+    it contains) is cached, so a check costs a pass over the value rather than
+    over the context.
+    """
+
+    def __init__(self, patterns: Iterable[str] = MARKER_PATTERNS):
+        self._markers = re.compile("|".join(f"(?:{p})" for p in patterns))
+        # Markers the user's text itself contains, found once per context
+        self._grounded_markers = lru_cache(maxsize=64)(self._find_markers)
+
+    def index(self, context: str) -> ContextIndex:
+        return _index(context or "")
+
+    def _find_markers(self, context: str) -> frozenset:
+        return frozenset(m.group(0) for m in self._markers.finditer(self.index(context).text))
+
+    def has_markers(self, text: str, context: str = "") -> bool:
+        """True if text contains a placeholder marker that is not in the user's text."""
+        grounded = self._grounded_markers(context or "")
+        for match in self._markers.finditer(_fold(text)):
+            # The user really wrote it (e.g. their address is at example.com)
+            if match.group(0) not in grounded:
+                return True
+        return False
+
+    def email_grounded(self, email: str, context: str) -> bool:
+        return _fold(email).strip() in self.index(context).emails
+
+    def phone_grounded(self, phone: str, context: str) -> bool:
+        digits = _NON_DIGIT.sub("", phone)
+        if len(digits) < _MIN_PHONE_DIGITS:
+            return False
+        # The model may add or drop a country code
+        return any(
+            known.endswith(digits) or digits.endswith(known)
+            for known in self.index(context).phones
+        )
+
+    def url_grounded(self, url: str, context: str) -> bool:
+        """A profile URL or bare username (GitHub, LinkedIn) that appears in the text."""
+        index = self.index(context)
+        key = _url_key(url)
+        if not key:
+            return False
+        if key in index.urls:
+            return True
+        handle = key.rsplit("/", 1)[-1]
+        return bool(handle) and handle in index.handles
+
+    def name_grounded(self, name: str, context: str) -> bool:
+        """Every word of the name appears in the text."""
+        words = _WORD.findall(_fold(name))
+        return bool(words) and all(word in self.index(context).words for word in words)
+
+
+detector = HallucinationDetector()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from . import metrics
+
+# Request hedging for async LLM calls: when a call is still running after the
+# p90 latency observed for that agent, a duplicate is sent and whichever
+# answers first wins (the other is cancelled). A process-wide budget caps
+# hedges at HEDGE_MAX_RATE of calls, which bounds the extra spend.
+
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "False").lower() == "true"
+# Latency quantile after which a duplicate is sent
+HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+# At most this share of calls is hedged (with a small burst allowance)
+HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "3"))
+# No hedging until an agent has this many latency samples
+MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+WINDOW = 200
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling latency window per call key and the shared hedge budget."""
+
+    def __init__(self, quantile: float = HEDGE_QUANTILE, max_rate: float = HEDGE_MAX_RATE,
+                 burst: float = HEDGE_BURST, min_samples: int = MIN_SAMPLES):
+        self.quantile = quantile
+        self.max_rate = max_rate
+        self.burst = burst
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=WINDOW))
+        self._budget = burst
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """How long to wait before hedging a call, or None while there are too few samples."""
+        with self._lock:
+            # Every call earns max_rate of a hedge
+            self._budget = min(self.burst, self._budget + self.max_rate)
+            samples = sorted(self._samples[key])
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.quantile))]
+
+    def take_hedge(self) -> bool:
+        """Spend one hedge from the budget if there is one."""
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            return True
+
+    def reset(self) -> None:
+        """Forget every sample and refill the budget (used by tests and benchmarks)."""
+        with self._lock:
+            self._samples.clear()
+            self._budget = self.burst
+
+
+tracker = LatencyTracker()
+
+
+def call_key(model: str, system_prompt: str) -> str:
+    # Agents have fixed system prompts, so this identifies the agent
+    return f"{model}:{hashlib.sha1(system_prompt.encode('utf-8')).hexdigest()[:12]}"
+
+
+async def hedged(key: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Await fn(), sending a duplicate if it is slower than usual for key; first answer wins."""
+    if not HEDGING_ENABLED:
+        return await fn()
+
+    # The caller's latency, hedge wait included: timing the winner alone would
+    # record a slow call as fast once hedged and pull the quantile down
+    start = time.monotonic()
+    delay = tracker.hedge_delay(key)
+    primary = asyncio.ensure_future(fn())
+    tasks = [primary]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if tracker.take_hedge():
+                    metrics.incr("llm.hedge.sent")
+                    tasks.append(asyncio.ensure_future(fn()))
+                else:
+                    metrics.incr("llm.hedge.over_budget")
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.observe(key, time.monotonic() - start)
+                    if task is not primary:
+                        metrics.incr("llm.hedge.won")
+                    return task.result()
+        # Every attempt failed: report the original call's error
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark the loser's error as seen so asyncio doesn't log it
+                task.exception()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import difflib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..models import ResumeModel
+from .segmenter import FULL_TEXT_SECTIONS, route, split_segments
+
+# Incremental re-extraction: when a user edits their text and resubmits, only
+# the sections whose paragraphs changed are extracted again; the others reuse
+# the outputs stored with their previous submission (ResumeModel.sections).
+
+# Above this share of changed paragraphs everything is extracted again
+MAX_CHANGED_SHARE = 0.5
+
+
+def changed_routes(old_text: str, new_text: str) -> Tuple[List[List[str]], int]:
+    """
+    Section routes of the paragraphs added, removed or edited between two
+    inputs, and the paragraph count of the longer one. Paragraphs are routed
+    in their document so they keep the sections of the heading they sit under.
+    """
+    old, new = split_segments(old_text), split_segments(new_text)
+    old_routes, new_routes = route(old), route(new)
+    changed = []
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            changed.extend(old_routes[i1:i2])
+            changed.extend(new_routes[j1:j2])
+    return changed, max(len(old), len(new))
+
+
+def reusable_sections(previous_input: Optional[str], previous_sections: Optional[Dict[str, Any]],
+                      new_input: str, sections: Iterable[str]) -> Dict[str, Any]:
+    """
+    Previous section outputs that are still valid for new_input.
+    A section is re-extracted when a changed paragraph routes to it, when a
+    changed paragraph can't be routed at all, or (like profile) when it
+    summarises the whole text and anything changed.
+    """
+    if not previous_input or not previous_sections:
+        return {}
+    sections = [s for s in sections if previous_sections.get(s) is not None]
+
+    changed, total = changed_routes(previous_input, new_input)
+    if not changed:
+        return {s: previous_sections[s] for s in sections}
+    # An edit counts twice (old and new paragraph)
+    if len(changed) > MAX_CHANGED_SHARE * 2 * total:
+        return {}
+
+    affected = set(FULL_TEXT_SECTIONS)
+    for routed_to in changed:
+        if not routed_to:
+            return {}
+        affected.update(routed_to)
+    return {s: previous_sections[s] for s in sections if s not in affected}
+
+
+async def alatest_sections(user) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """The user's last input and its stored section outputs, if any."""
+    previous = await (
+        ResumeModel.objects.filter(user=user, sections__isnull=False)
+        .order_by('-id')
+        .only('user_input', 'sections')
+        .afirst()
+    )
+    if previous is None:
+        return None, None
+    return previous.user_input, previous.sections
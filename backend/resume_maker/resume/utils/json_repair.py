@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import ast
+import json
+import re
+from typing import Any, Optional
+
+# Deterministic repair of almost-valid JSON returned by the agents.
+# Handles the failures we see most: ```json fences, prose before/after the
+# object, single-quoted (Python-style) dicts, trailing commas and output
+# truncated before its closing brackets.
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_OPEN_FENCE = re.compile(r"^\s*```(?:json|JSON)?")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+# Don't hand huge inputs to ast.literal_eval
+_MAX_LITERAL_EVAL = 100_000
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE.search(text)
+    if match:
+        return match.group(1).strip()
+    # Unterminated fence (truncated output)
+    return _OPEN_FENCE.sub("", text).strip()
+
+
+def _outermost(text: str) -> Optional[str]:
+    """
+    Slice from the first '{' or '[' to the bracket that closes it, ignoring
+    brackets inside strings. If it never closes, return everything from the
+    opening bracket so _balance() can finish it.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    start = min(starts)
+
+    depth, in_string, quote, escaped = 0, False, "", False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                in_string = False
+        elif ch in "\"'":
+            in_string, quote = True, ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _balance(text: str) -> str:
+    """Close an unterminated string and any brackets left open."""
+    stack, in_string, quote, escaped = [], False, "", False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                in_string = False
+        elif ch in "\"'":
+            in_string, quote = True, ch
+        elif ch in "{[":
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += quote
+    text = text.rstrip().rstrip(",")
+    # A dangling key ("key": <nothing>) can't be completed, drop it
+    text = re.sub(r',?\s*"[^"]*"\s*:\s*$', "", text)
+    return text + "".join(reversed(stack))
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+    except (json.JSONDecodeError, ValueError):
+        pass
+    # Python-style dicts: single quotes, True/False/None
+    if len(text) <= _MAX_LITERAL_EVAL:
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+        if isinstance(value, (dict, list)):
+            return value
+    return None
+
+
+def repair_json_value(text: str) -> Optional[Any]:
+    """
+    Try to parse an almost-valid JSON answer.
+    Returns the parsed dict or list, or None if the text can't be repaired.
+    """
+    if not text or not isinstance(text, str):
+        return None
+
+    candidate = _outermost(_strip_fences(text.strip()))
+    if candidate is None:
+        return None
+
+    value = _loads(candidate)
+    if value is None:
+        value = _loads(_balance(candidate))
+    if not isinstance(value, (dict, list)):
+        return None
+    return value
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Try to turn an almost-valid JSON answer into valid JSON.
+    Returns the repaired JSON string, or None if the text can't be repaired.
+    """
+    value = repair_json_value(text)
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from openai import APITimeoutError
+
+from . import deadline, hedging, llm_cache, metrics, providers, ratelimit, resilience
+
+# Shared LLM gateway: every agent in resume/agents calls the model through here.
+# A call is answered from the response cache when possible; otherwise it waits
+# for the shared rate limit and goes to the configured provider (providers.py)
+# with retries and a circuit breaker (resilience.py), hedged on the async path.
+# Calls about the same text pass it as `context`: it is sent ahead of their
+# instructions, so the provider's prompt cache can serve that shared prefix.
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Set by the parser while retrying a section: how many of its outputs failed
+# validation, i.e. how far up its model cascade the next call goes.
+_escalation = contextvars.ContextVar("llm_escalation", default=0)
+
+
+@contextmanager
+def escalate(level: int):
+    """Call agents inside this block on the level-th model of their cascade (capped at the last)."""
+    token = _escalation.set(level)
+    try:
+        yield
+    finally:
+        _escalation.reset(token)
+
+
+def _cascade(agent: Optional[str]) -> list:
+    return getattr(settings, "LLM_MODELS", {}).get(agent) or [DEFAULT_MODEL]
+
+
+def model_for(agent: Optional[str]) -> str:
+    """The model an agent calls now: its cascade (settings.LLM_MODELS, cheapest first) at the current escalation."""
+    models = _cascade(agent)
+    requested = _escalation.get()
+    level = min(requested, len(models) - 1)
+    if requested > level:
+        # Already on the last model: the retry runs on it again
+        metrics.incr(f"llm.cascade.capped.{agent}")
+    elif level:
+        metrics.incr(f"llm.cascade.escalated.{agent}")
+    return models[level]
+
+
+def _rejected_model(agent: Optional[str]) -> Optional[str]:
+    """
+    The model whose answer the parser just rejected, when this escalated call
+    moved past it. A retry on the same model overwrites its cache entry anyway.
+    """
+    level = _escalation.get()
+    if not level:
+        return None
+    models = _cascade(agent)
+    previous, current = models[min(level - 1, len(models) - 1)], models[min(level, len(models) - 1)]
+    return previous if previous != current else None
+
+
+def _record(agent: Optional[str], model: str, seconds: float, usage: dict) -> None:
+    # Per agent and model, to tune the cascade: escalation share, latency and tokens
+    prefix = f"llm.calls.{agent or 'other'}.{model}"
+    metrics.incr(f"{prefix}.count")
+    metrics.incr(f"{prefix}.seconds", seconds)
+    metrics.incr(f"{prefix}.input_tokens", usage.get("input_tokens", 0))
+    metrics.incr(f"{prefix}.output_tokens", usage.get("output_tokens", 0))
+    # Input tokens the provider served from its prompt cache: cheaper and faster to first token
+    metrics.incr(f"{prefix}.cached_tokens", usage.get("cached_tokens", 0))
+    metrics.incr("llm.prompt_cache.input_tokens", usage.get("input_tokens", 0))
+    metrics.incr("llm.prompt_cache.cached_tokens", usage.get("cached_tokens", 0))
+    if usage.get("cached_tokens"):
+        metrics.incr("llm.prompt_cache.hits")
+
+
+def _response_key(model: str, system_prompt: str, user_prompt: str, schema: Optional[dict],
+                  context: Optional[str]) -> str:
+    # Calls without a context keep the keys they had before contexts existed
+    extra = {} if context is None else {"context": context}
+    return llm_cache.make_key(model, system_prompt, user_prompt, schema=schema, **extra)
+
+
+def _create(model: str, system_prompt: str, user_prompt: str, schema: Optional[dict],
+            context: Optional[str]):
+    """One request to the provider, once the account's rate limit allows it."""
+    ratelimit.acquire(ratelimit.estimate_tokens(system_prompt, user_prompt, context or ""))
+    return providers.get_provider().complete(model, system_prompt, user_prompt, schema, context)
+
+
+async def _acreate(model: str, system_prompt: str, user_prompt: str, schema: Optional[dict],
+                   context: Optional[str]):
+    """Async variant of _create."""
+    await ratelimit.aacquire(ratelimit.estimate_tokens(system_prompt, user_prompt, context or ""))
+    return await providers.get_provider().acomplete(model, system_prompt, user_prompt, schema, context)
+
+
+def invoke(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+           schema: Optional[dict] = None, agent: Optional[str] = None,
+           context: Optional[str] = None) -> str:
+    """Blocking call; returns the text of the model's answer (model defaults to the agent's cascade)."""
+    rejected = _rejected_model(agent) if model is None else None
+    model = model or model_for(agent)
+    key = _response_key(model, system_prompt, user_prompt, schema, context)
+    if rejected:
+        # Escalated past an answer that failed validation: drop it so identical requests
+        # don't get it back, but reuse the stronger model's answer (the retry's bypass
+        # is only there to keep the rejected answer away)
+        llm_cache.discard(_response_key(rejected, system_prompt, user_prompt, schema, context))
+        with llm_cache.bypass(False):
+            cached = llm_cache.get(key)
+    else:
+        cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    start = time.monotonic()
+    try:
+        text, usage = resilience.call(lambda: _create(model, system_prompt, user_prompt, schema, context))
+    except APITimeoutError as e:
+        if deadline.remaining() is not None:
+            raise deadline.DeadlineExceeded() from e
+        raise
+    seconds = time.monotonic() - start
+    _record(agent, model, seconds, usage)
+    llm_cache.set(key, model, text, seconds, usage["input_tokens"], usage["output_tokens"])
+    return text
+
+
+async def ainvoke(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+                  schema: Optional[dict] = None, agent: Optional[str] = None,
+                  context: Optional[str] = None) -> str:
+    """Async call; returns the text of the model's answer (model defaults to the agent's cascade)."""
+    rejected = _rejected_model(agent) if model is None else None
+    model = model or model_for(agent)
+    key = _response_key(model, system_prompt, user_prompt, schema, context)
+    if rejected:
+        # See invoke()
+        await sync_to_async(llm_cache.discard)(
+            _response_key(rejected, system_prompt, user_prompt, schema, context)
+        )
+        with llm_cache.bypass(False):
+            cached = await sync_to_async(llm_cache.get)(key)
+    else:
+        cached = await sync_to_async(llm_cache.get)(key)
+    if cached is not None:
+        return cached
+
+    start = time.monotonic()
+    try:
+        # A straggling call may be duplicated (see hedging.py); each copy has its own retries
+        text, usage = await hedging.hedged(
+            hedging.call_key(model, system_prompt),
+            lambda: resilience.acall(lambda: _acreate(model, system_prompt, user_prompt, schema, context)),
+        )
+    except APITimeoutError as e:
+        if deadline.remaining() is not None:
+            raise deadline.DeadlineExceeded() from e
+        raise
+    seconds = time.monotonic() - start
+    _record(agent, model, seconds, usage)
+    await sync_to_async(llm_cache.set)(key, model, text, seconds, usage["input_tokens"], usage["output_tokens"])
+    return text
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import itertools
+import json
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from ..models import LLMResponseCache
+from . import metrics
+
+# Content-addressed cache for LLM responses, backed by the LLMResponseCache table.
+# Entries expire after LLM_CACHE_TTL seconds and the least recently used ones are
+# evicted once the table grows past LLM_CACHE_MAX_ENTRIES.
+
+# Evict every N writes instead of counting rows on every write
+EVICT_EVERY = 100
+
+# Write counter shared by the request and LangGraph pool threads; next() on an
+# itertools.count is atomic, where `+= 1` on a global can lose updates
+_writes = itertools.count(1)
+
+# Set by the parser while retrying a section: a retry must reach the model,
+# otherwise it would get back the same cached answer that just failed validation.
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass(active: bool = True):
+    """Skip cache reads (writes still refresh the entry) inside this block."""
+    token = _bypass.set(active)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def make_key(model: str, system_prompt: str, user_prompt: str, **extra) -> str:
+    """Hash of everything that determines the model's answer."""
+    payload = json.dumps([model, system_prompt, user_prompt, extra], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _enabled() -> bool:
+    return getattr(settings, "LLM_CACHE_ENABLED", True)
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None on a miss."""
+    if not _enabled() or _bypass.get():
+        return None
+    # The cache is best effort: a database error never fails the LLM call
+    try:
+        return _get(key)
+    except DatabaseError as e:
+        print(f"LLM cache read failed: {e}")
+        metrics.incr("llm_cache.error")
+        return None
+
+
+def _get(key: str) -> Optional[str]:
+    cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+    entry = LLMResponseCache.objects.filter(key=key, created_at__gte=cutoff).first()
+    if entry is None:
+        metrics.incr("llm_cache.miss")
+        return None
+
+    LLMResponseCache.objects.filter(pk=entry.pk).update(last_used_at=timezone.now())
+    metrics.incr("llm_cache.hit")
+    metrics.incr("llm_cache.saved_seconds", entry.latency)
+    metrics.incr("llm_cache.saved_input_tokens", entry.input_tokens)
+    metrics.incr("llm_cache.saved_output_tokens", entry.output_tokens)
+    return entry.response
+
+
+def set(key: str, model: str, response: str, latency: float = 0,
+        input_tokens: int = 0, output_tokens: int = 0) -> None:
+    """Store (or refresh) a response."""
+    if not _enabled() or not response:
+        return
+    try:
+        _set(key, model, response, latency, input_tokens, output_tokens)
+    except DatabaseError as e:
+        print(f"LLM cache write failed: {e}")
+        metrics.incr("llm_cache.error")
+
+
+def discard(key: str) -> None:
+    """Drop a response that failed validation, so later identical calls don't get it back."""
+    if not _enabled():
+        return
+    try:
+        deleted, _ = LLMResponseCache.objects.filter(key=key).delete()
+    except DatabaseError as e:
+        print(f"LLM cache delete failed: {e}")
+        metrics.incr("llm_cache.error")
+        return
+    if deleted:
+        metrics.incr("llm_cache.discarded")
+
+
+def _set(key: str, model: str, response: str, latency: float,
+         input_tokens: int, output_tokens: int) -> None:
+    now = timezone.now()
+    LLMResponseCache.objects.update_or_create(
+        key=key,
+        defaults={
+            "model": model,
+            "response": response,
+            "latency": latency,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "created_at": now,
+            "last_used_at": now,
+        },
+    )
+
+    if next(_writes) % EVICT_EVERY == 0:
+        evict()
+
+
+def evict() -> int:
+    """Drop expired entries, then the least recently used ones above the size bound."""
+    cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+    deleted, _ = LLMResponseCache.objects.filter(created_at__lt=cutoff).delete()
+
+    max_entries = settings.LLM_CACHE_MAX_ENTRIES
+    boundary = (
+        LLMResponseCache.objects.order_by("-last_used_at")
+        .values_list("last_used_at", flat=True)[max_entries:max_entries + 1]
+    )
+    boundary = list(boundary)
+    if boundary:
+        extra, _ = LLMResponseCache.objects.filter(last_used_at__lte=boundary[0]).delete()
+        deleted += extra
+        metrics.incr("llm_cache.evicted", extra)
+    return deleted
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+# In-process counters for the resume pipeline (LLM cache, retries, ...).
+# Values are per worker process; GET /metrics/ exposes them to staff users.
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Add value to the named counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def snapshot() -> Dict[str, float]:
+    """Return a copy of every counter, sorted by name."""
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset() -> None:
+    """Clear every counter (used by tests and benchmarks)."""
+    with _lock:
+        _counters.clear()
@@ -1,21 +1,36 @@
 from __future__ import annotations
 
 from langgraph.graph import StateGraph, START, END
+from django.conf import settings
+from django.db import connections
+from . import deadline, llm, llm_cache, metrics
+from .chunking import LIST_SECTIONS, merge_states, split_chunks
+from .extractors import extract_contacts, extract_name
+from .hallucination import detector
+from .incremental import alatest_sections, reusable_sections
+from .json_repair import repair_json_value
+from .segmenter import approx_tokens, segment
+from . import singleflight
 from ..agents import (
     skills_agent, education_agent,
     experience_agent,
     references_agent,
     personal_information_agent, profile_agent,
-    courses_agent, name_agent)
+    courses_agent, name_agent, resume_agent, shared)
+import asyncio
+import contextvars
+import copy
+import math
 import os
-import re
-from dotenv import load_dotenv
-from openai import OpenAI
-from typing import TypedDict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import operator
+from typing import Annotated, TypedDict
 
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 #----------functions to make the output---------
@@ -23,16 +38,40 @@ from jinja2 import Environment, FileSystemLoader, select_autoescape
 # Maximum retries per agent
 MAX_RETRIES = 2
 
+# Pipeline modes: one agent per section, or one call for the whole resume
+PARSER_MODES = ("graph", "single")
+
+# Maximum number of agents running at the same time
+MAX_CONCURRENCY = int(os.getenv("PARSER_MAX_CONCURRENCY", "8"))
+
+# Upper bound on chunks for long inputs; beyond it chunks grow instead
+MAX_CHUNKS = 16
+
+# Minimum confidence for a rule-extracted name to replace the name/personal_info agents
+RULE_MIN_CONFIDENCE = 0.8
+
 class State(TypedDict):
     context: str
-    name: str
-    skills: str
-    education: str
-    experience: str
-    references: str
-    personal_info: str
+    # Parsed agent outputs ({"name": ...}, {"experience": [...]}, ...);
+    # profile is plain text
+    name: Dict[str, Any]
+    skills: Dict[str, Any]
+    education: Dict[str, Any]
+    experience: Dict[str, Any]
+    references: Dict[str, Any]
+    personal_info: Dict[str, Any]
     profile: str
-    courses: str
+    courses: Dict[str, Any]
+    # Part of the context routed to each section agent (resume/utils/segmenter.py)
+    slices: Dict[str, str]
+    # Sections whose agents share one prompt prefix for the full text (resume/agents/shared.py)
+    shared_sections: List[str]
+    # time.monotonic() by which the run must finish (None: no budget)
+    deadline_at: Optional[float]
+    # Sections the deadline cut short (filled with their empty fallback)
+    missing: Annotated[List[str], operator.add]
+    # Sections that ran out of retries (filled with their empty fallback)
+    exhausted: Annotated[List[str], operator.add]
     # Retry counters for each agent
     retry_name: int
     retry_personal_info: int
@@ -45,20 +84,55 @@ class State(TypedDict):
 
 
 # ===== Validation Functions =====
+# Agent output is parsed once (_parse_output); validators, the graph state and
+# normalize() all work on the parsed object instead of the JSON string.
+
+# Sections whose agent answers in plain text rather than JSON
+TEXT_SECTIONS = ("profile",)
 
-def _is_valid_json(text: str) -> bool:
-    """Check if the text is valid JSON."""
+# Marks output that could not be parsed (None is a valid JSON value)
+_INVALID = object()
+
+
+def _parse_json(text: str) -> Any:
+    """Parse a JSON object or array, or return _INVALID."""
     if not text or not isinstance(text, str):
-        return False
+        return _INVALID
     text = text.strip()
     if not ((text.startswith("{") and text.endswith("}")) or
             (text.startswith("[") and text.endswith("]"))):
-        return False
+        return _INVALID
     try:
-        json.loads(text)
-        return True
+        return json.loads(text)
     except (json.JSONDecodeError, ValueError):
-        return False
+        return _INVALID
+
+
+def _parse_output(section: str, output: str) -> Any:
+    """Parse one agent answer into the object kept in the state."""
+    if section in TEXT_SECTIONS:
+        return output if isinstance(output, str) else _INVALID
+    return _parse_json(output)
+
+
+def _repair_output(section: str, output: str) -> Any:
+    """Parse an almost-valid JSON answer with repair_json_value(), or return _INVALID."""
+    if section in TEXT_SECTIONS:
+        return _INVALID
+    value = repair_json_value(output)
+    return _INVALID if value is None else value
+
+
+def _iter_strings(value: Any) -> Iterable[str]:
+    """Yield every string inside a parsed JSON value."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
 
 
 def _contains_hallucination_markers(text: str, context: str) -> bool:
@@ -68,180 +142,134 @@ def _contains_hallucination_markers(text: str, context: str) -> bool:
     """
     if not text:
         return True
+    return detector.has_markers(text, context)
 
-    text_lower = text.lower()
 
-    # Check for common hallucination patterns
-    hallucination_patterns = [
-        r'\bexample\.com\b',
-        r'\bjohn\.doe\b',
-        r'\bjane\.doe\b',
-        r'\btest@test\b',
-        r'\bplaceholder\b',
-        r'\blorem ipsum\b',
-        r'\bxxx\b',
-        r'\b123-456-7890\b',
-        r'\b555-\d{4}\b',  # Fake phone numbers
-    ]
+def _has_hallucination_markers(value: Any, context: str) -> bool:
+    """_contains_hallucination_markers() over the string values of a parsed object."""
+    text = "\n".join(_iter_strings(value))
+    return bool(text) and _contains_hallucination_markers(text, context)
 
-    for pattern in hallucination_patterns:
-        if re.search(pattern, text_lower):
-            return True
 
-    return False
-
-
-def _validate_personal_info(output: str, context: str) -> bool:
+def _validate_personal_info(data: Any, context: str) -> bool:
     """Validate personal_info agent output."""
-    if not _is_valid_json(output):
+    # Must have profile key
+    if not isinstance(data, dict) or "profile" not in data:
         return False
 
-    try:
-        data = json.loads(output)
-        # Must have profile key
-        if "profile" not in data:
-            return False
-
-        profile = data["profile"]
-        # Empty profile is valid (means no data found)
-        if not profile:
-            return True
-
-        # If profile has data, check for hallucination
-        if _contains_hallucination_markers(output, context):
-            return False
-
+    profile = data["profile"]
+    # Empty profile is valid (means no data found)
+    if not profile:
         return True
-    except:
+
+    # If profile has data, check for hallucination
+    if _has_hallucination_markers(profile, context):
         return False
 
+    return True
+
 
-def _validate_experience(output: str, context: str) -> bool:
+def _validate_experience(data: Any, context: str) -> bool:
     """Validate experience agent output."""
-    if not _is_valid_json(output):
+    if not isinstance(data, dict) or "experience" not in data:
         return False
 
-    try:
-        data = json.loads(output)
-        if "experience" not in data:
+    # Empty array is valid
+    if not data["experience"]:
+        return True
+    if not isinstance(data["experience"], list):
+        return False
+
+    # Check each experience entry
+    for exp in data["experience"]:
+        if not isinstance(exp, dict):
+            return False
+        # Check for hallucinated data
+        if _has_hallucination_markers(exp, context):
             return False
 
-        # Empty array is valid
-        if not data["experience"]:
-            return True
+    return True
 
-        # Check each experience entry
-        for exp in data["experience"]:
-            if not isinstance(exp, dict):
-                return False
-            # Check for hallucinated data
-            if _contains_hallucination_markers(json.dumps(exp), context):
-                return False
 
-        return True
-    except:
+def _validate_education(data: Any, context: str) -> bool:
+    """Validate education agent output."""
+    if not isinstance(data, dict) or "education" not in data:
         return False
 
-
-def _validate_education(output: str, context: str) -> bool:
-    """Validate education agent output."""
-    if not _is_valid_json(output):
+    # Empty array is valid
+    if not data["education"]:
+        return True
+    if not isinstance(data["education"], list):
         return False
 
-    try:
-        data = json.loads(output)
-        if "education" not in data:
+    for edu in data["education"]:
+        if not isinstance(edu, dict):
+            return False
+        if _has_hallucination_markers(edu, context):
             return False
 
-        # Empty array is valid
-        if not data["education"]:
-            return True
+    return True
 
-        for edu in data["education"]:
-            if not isinstance(edu, dict):
-                return False
-            if _contains_hallucination_markers(json.dumps(edu), context):
-                return False
 
-        return True
-    except:
+def _validate_skills(data: Any, context: str) -> bool:
+    """Validate skills agent output."""
+    if not isinstance(data, dict) or "skills" not in data:
         return False
 
-
-def _validate_skills(output: str, context: str) -> bool:
-    """Validate skills agent output."""
-    if not _is_valid_json(output):
+    # Empty array is valid
+    if not data["skills"]:
+        return True
+    if not isinstance(data["skills"], list):
         return False
 
-    try:
-        data = json.loads(output)
-        if "skills" not in data:
+    for skill_group in data["skills"]:
+        if not isinstance(skill_group, dict):
+            return False
+        if "category" not in skill_group or "skills" not in skill_group:
             return False
 
-        # Empty array is valid
-        if not data["skills"]:
-            return True
+    return True
 
-        for skill_group in data["skills"]:
-            if not isinstance(skill_group, dict):
-                return False
-            if "category" not in skill_group or "skills" not in skill_group:
-                return False
 
-        return True
-    except:
+def _validate_courses(data: Any, context: str) -> bool:
+    """Validate courses agent output."""
+    if not isinstance(data, dict) or "courses_and_certifications" not in data:
         return False
 
-
-def _validate_courses(output: str, context: str) -> bool:
-    """Validate courses agent output."""
-    if not _is_valid_json(output):
+    # Empty array is valid
+    if not data["courses_and_certifications"]:
+        return True
+    if not isinstance(data["courses_and_certifications"], list):
         return False
 
-    try:
-        data = json.loads(output)
-        if "courses_and_certifications" not in data:
+    for course in data["courses_and_certifications"]:
+        if not isinstance(course, dict):
+            return False
+        if _has_hallucination_markers(course, context):
             return False
 
-        # Empty array is valid
-        if not data["courses_and_certifications"]:
-            return True
+    return True
 
-        for course in data["courses_and_certifications"]:
-            if not isinstance(course, dict):
-                return False
-            if _contains_hallucination_markers(json.dumps(course), context):
-                return False
 
-        return True
-    except:
+def _validate_references(data: Any, context: str) -> bool:
+    """Validate references agent output."""
+    if not isinstance(data, dict) or "references" not in data:
         return False
 
-
-def _validate_references(output: str, context: str) -> bool:
-    """Validate references agent output."""
-    if not _is_valid_json(output):
+    # Empty array is valid
+    if not data["references"]:
+        return True
+    if not isinstance(data["references"], list):
         return False
 
-    try:
-        data = json.loads(output)
-        if "references" not in data:
+    for ref in data["references"]:
+        if not isinstance(ref, dict):
+            return False
+        # References are very sensitive - check for hallucination
+        if _has_hallucination_markers(ref, context):
             return False
 
-        # Empty array is valid
-        if not data["references"]:
-            return True
-
-        for ref in data["references"]:
-            if not isinstance(ref, dict):
-                return False
-            # References are very sensitive - check for hallucination
-            if _contains_hallucination_markers(json.dumps(ref), context):
-                return False
-
-        return True
-    except:
-        return False
+    return True
 
 
 def _validate_profile(output: str, context: str) -> bool:
@@ -266,339 +294,472 @@ def _validate_profile(output: str, context: str) -> bool:
     return True
 
 
-def _validate_name(output: str, context: str) -> bool:
+def _validate_name(data: Any, context: str) -> bool:
     """Validate name agent output."""
-    if not _is_valid_json(output):
+    if not isinstance(data, dict) or "name" not in data:
         return False
 
-    try:
-        data = json.loads(output)
-        if "name" not in data:
-            return False
+    name = data["name"]
+    # Empty name is valid (means no name found)
+    if not name:
+        return True
 
-        name = data["name"]
-        # Empty name is valid (means no name found)
-        if not name:
-            return True
+    # Name should be a non-empty string
+    if not isinstance(name, str):
+        return False
 
-        # Name should be a non-empty string
-        if not isinstance(name, str):
-            return False
+    # Check for hallucination markers
+    if _contains_hallucination_markers(name, context):
+        return False
 
-        # Check for hallucination markers
-        if _contains_hallucination_markers(name, context):
-            return False
+    return True
 
-        return True
-    except:
-        return False
+
+# ===== Grounding =====
+# Names and contact details the user never wrote are dropped from otherwise valid
+# output: one bad field doesn't warrant another LLM call for the whole section.
+
+def _ungrounded(field: str) -> None:
+    metrics.incr(f"hallucination.ungrounded.{field}")
+
+
+def _contact_grounded(value: str, context: str) -> bool:
+    if "@" in value:
+        return detector.email_grounded(value, context)
+    return detector.phone_grounded(value, context)
+
+
+def _ground_name(data: Dict[str, Any], context: str) -> Dict[str, Any]:
+    name = data.get("name")
+    if name and not detector.name_grounded(name, context):
+        _ungrounded("name")
+        return {**data, "name": ""}
+    return data
+
+
+def _ground_personal_info(data: Dict[str, Any], context: str) -> Dict[str, Any]:
+    profile = data.get("profile")
+    if not isinstance(profile, dict):
+        return data
+
+    profile = dict(profile)
+    for field in ("name", "surname"):
+        value = profile.get(field)
+        if isinstance(value, str) and value and not detector.name_grounded(value, context):
+            _ungrounded(field)
+            profile[field] = None
+    phone = profile.get("phone_number")
+    if isinstance(phone, str) and phone and not detector.phone_grounded(phone, context):
+        _ungrounded("phone_number")
+        profile["phone_number"] = None
+
+    accounts = profile.get("accounts")
+    if isinstance(accounts, dict):
+        accounts = dict(accounts)
+        checks = {"email": detector.email_grounded, "github": detector.url_grounded,
+                  "linkedin": detector.url_grounded}
+        for field, grounded in checks.items():
+            value = accounts.get(field)
+            if isinstance(value, str) and value and not grounded(value, context):
+                _ungrounded(field)
+                accounts[field] = None
+        profile["accounts"] = accounts
+    return {**data, "profile": profile}
+
+
+def _ground_references(data: Dict[str, Any], context: str) -> Dict[str, Any]:
+    references = []
+    for ref in data.get("references") or []:
+        # A reference whose name isn't in the text is invented, drop it
+        if not detector.name_grounded(str(ref.get("name") or ""), context):
+            _ungrounded("reference")
+            continue
+        contact = ref.get("contact")
+        if isinstance(contact, str) and contact and not _contact_grounded(contact, context):
+            _ungrounded("reference_contact")
+            ref = {**ref, "contact": None}
+        references.append(ref)
+    return {**data, "references": references}
+
+
+# Section key -> grounding step, run on output that passed validation
+GROUNDERS = {
+    "name": _ground_name,
+    "personal_info": _ground_personal_info,
+    "references": _ground_references,
+}
+
+
+def _ground(section: str, value: Any, context: str) -> Any:
+    grounder = GROUNDERS.get(section)
+    return grounder(value, context) if grounder else value
+
+
+# Section key -> validator
+VALIDATORS = {
+    "name": _validate_name,
+    "personal_info": _validate_personal_info,
+    "profile": _validate_profile,
+    "education": _validate_education,
+    "experience": _validate_experience,
+    "courses": _validate_courses,
+    "skills": _validate_skills,
+    "references": _validate_references,
+}
 
 
 # ===== Wrapper Nodes with Validation and Retry =====
 
+def _missing(section: str, fallback: Any) -> dict:
+    """State update for a section the deadline cut short: empty fallback, marked missing."""
+    metrics.incr(f"parser.deadline.missing.{section}")
+    return {section: copy.deepcopy(fallback), f"retry_{section}": 0, "missing": [section]}
+
+
+def _settle(section: str, output: str, state: State, validator, fallback: Any,
+            can_retry: bool = True) -> dict:
+    """
+    Turn one agent output into a state update.
+    The output is parsed once and the parsed object is what the state keeps,
+    after ungrounded names and contacts are dropped from it.
+    Invalid output is first run through the JSON repair, and only if that
+    fails does it increment the section's retry counter.
+    Once MAX_RETRIES is reached the empty fallback is used; when the deadline
+    leaves no time for another attempt (can_retry=False) the section is missing.
+    """
+    retry_key = f"retry_{section}"
+    retry_count = state.get(retry_key, 0)
+    metrics.incr(f"parser.attempts.{section}")
+
+    value = _parse_output(section, output)
+    if value is not _INVALID and validator(value, state["context"]):
+        return {section: _ground(section, value, state["context"]), retry_key: 0}
+    # Invalid output - try a local repair before paying for another LLM call
+    value = _repair_output(section, output)
+    if value is not _INVALID and validator(value, state["context"]):
+        metrics.incr(f"parser.repaired.{section}")
+        return {section: _ground(section, value, state["context"]), retry_key: 0}
+    # Still invalid - increment retry counter
+    if retry_count < MAX_RETRIES:
+        if not can_retry:
+            return _missing(section, fallback)
+        metrics.incr(f"parser.retries.{section}")
+        return {section: None, retry_key: retry_count + 1}
+    # Max retries reached - return empty valid output
+    metrics.incr(f"parser.exhausted.{section}")
+    return {section: copy.deepcopy(fallback), retry_key: 0, "exhausted": [section]}
+
+
+def _share_prefix(state: dict, pending: List[str]) -> None:
+    """
+    Give the pending sections that are sent the whole text the shared prompt
+    layout, when it bills fewer input tokens than their own (shared.worthwhile).
+    """
+    slices = state.get("slices") or {}
+    full_text = [s for s in pending if slices.get(s, state["context"]) == state["context"]]
+    state["shared_sections"] = full_text if shared.worthwhile(state["context"], full_text) else []
+    metrics.incr("parser.shared_prefix.sections", len(state["shared_sections"]))
+
+
+def _agent_state(section: str, state: State) -> State:
+    """The state as the section agent sees it: its slice of the input as the context."""
+    slices = state.get("slices") or {}
+    if section not in slices:
+        return state
+    return {**state, "context": slices[section]}
+
+
+def _can_retry(deadline_at: Optional[float], last_attempt: float) -> bool:
+    # Only start another attempt if one as slow as the last still fits the budget
+    return deadline_at is None or deadline_at - time.monotonic() > last_attempt
+
+
+# Set by parse() to the thread running the workflow. LangGraph runs parallel
+# branches on its own pool threads, and the database connections a node opens
+# there (response cache, rate limit) would otherwise outlive the node.
+_workflow_thread = contextvars.ContextVar("parser_workflow_thread", default=None)
+
+
+def _release_connections() -> None:
+    """Close this thread's database connections if it is a LangGraph pool thread."""
+    owner = _workflow_thread.get()
+    if owner is not None and owner != threading.get_ident():
+        connections.close_all()
+
+
+def _run_section(section: str, agent, state: State, validator, fallback: Any) -> dict:
+    """
+    Call a section agent and settle its output. Retries skip the response cache and
+    escalate to the section's next model (settings.LLM_MODELS).
+    The call runs under the request's deadline; running out of time marks the section missing.
+    """
+    deadline_at = state.get("deadline_at")
+    start = time.monotonic()
+    retry = state.get(f"retry_{section}", 0)
+    try:
+        # A retry skips the cached answer and moves one model up the section's cascade
+        with deadline.within(deadline_at), llm_cache.bypass(retry > 0), llm.escalate(retry):
+            result = agent(_agent_state(section, state))
+    except deadline.DeadlineExceeded:
+        return _missing(section, fallback)
+    finally:
+        _release_connections()
+    return _settle(section, result.get(section, ""), state, validator, fallback,
+                   can_retry=_can_retry(deadline_at, time.monotonic() - start))
+
+
+async def _arun_section(section: str, agent, state: State, validator, fallback: Any) -> dict:
+    """Async variant of _run_section."""
+    deadline_at = state.get("deadline_at")
+    start = time.monotonic()
+    retry = state.get(f"retry_{section}", 0)
+    try:
+        # A retry skips the cached answer and moves one model up the section's cascade
+        with deadline.within(deadline_at), llm_cache.bypass(retry > 0), llm.escalate(retry):
+            result = await agent(_agent_state(section, state))
+    except deadline.DeadlineExceeded:
+        return _missing(section, fallback)
+    return _settle(section, result.get(section, ""), state, validator, fallback,
+                   can_retry=_can_retry(deadline_at, time.monotonic() - start))
+
+
 def get_name_with_retry(state: State) -> dict:
     """Wrapper for name agent with validation and retry."""
-    retry_count = state.get("retry_name", 0)
+    return _run_section("name", name_agent.get_name, state, _validate_name, {"name": ""})
 
-    result = name_agent.get_name(state)
-    output = result.get("name", "")
 
-    if _validate_name(output, state["context"]):
-        return {"name": output, "retry_name": 0}
-    else:
-        # Invalid output - increment retry counter
-        if retry_count < MAX_RETRIES:
-            return {"name": "", "retry_name": retry_count + 1}
-        else:
-            # Max retries reached - return empty valid JSON
-            return {"name": '{"name": ""}', "retry_name": 0}
+async def aget_name_with_retry(state: State) -> dict:
+    """Async wrapper for name agent with validation and retry."""
+    return await _arun_section("name", name_agent.aget_name, state, _validate_name, {"name": ""})
 
 
 def get_personal_info_with_retry(state: State) -> dict:
     """Wrapper for personal_info agent with validation and retry."""
-    retry_count = state.get("retry_personal_info", 0)
+    return _run_section("personal_info", personal_information_agent.get_personal_info, state, _validate_personal_info, {"profile": {}})
 
-    result = personal_information_agent.get_personal_info(state)
-    output = result.get("personal_info", "")
 
-    if _validate_personal_info(output, state["context"]):
-        return {"personal_info": output, "retry_personal_info": 0}
-    else:
-        # Invalid output - increment retry counter
-        if retry_count < MAX_RETRIES:
-            return {"personal_info": "", "retry_personal_info": retry_count + 1}
-        else:
-            # Max retries reached - return empty valid JSON
-            return {"personal_info": '{"profile": {}}', "retry_personal_info": 0}
+async def aget_personal_info_with_retry(state: State) -> dict:
+    """Async wrapper for personal_info agent with validation and retry."""
+    return await _arun_section("personal_info", personal_information_agent.aget_personal_info, state, _validate_personal_info, {"profile": {}})
 
 
 def get_profile_with_retry(state: State) -> dict:
     """Wrapper for profile agent with validation and retry."""
-    retry_count = state.get("retry_profile", 0)
+    return _run_section("profile", profile_agent.get_profile, state, _validate_profile, "Professional summary not available.")
 
-    result = profile_agent.get_profile(state)
-    output = result.get("profile", "")
 
-    if _validate_profile(output, state["context"]):
-        return {"profile": output, "retry_profile": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"profile": "", "retry_profile": retry_count + 1}
-        else:
-            return {"profile": "Professional summary not available.", "retry_profile": 0}
+async def aget_profile_with_retry(state: State) -> dict:
+    """Async wrapper for profile agent with validation and retry."""
+    return await _arun_section("profile", profile_agent.aget_profile, state, _validate_profile, "Professional summary not available.")
 
 
 def get_education_with_retry(state: State) -> dict:
     """Wrapper for education agent with validation and retry."""
-    retry_count = state.get("retry_education", 0)
+    return _run_section("education", education_agent.get_education, state, _validate_education, {"education": []})
 
-    result = education_agent.get_education(state)
-    output = result.get("education", "")
 
-    if _validate_education(output, state["context"]):
-        return {"education": output, "retry_education": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"education": "", "retry_education": retry_count + 1}
-        else:
-            return {"education": '{"education": []}', "retry_education": 0}
+async def aget_education_with_retry(state: State) -> dict:
+    """Async wrapper for education agent with validation and retry."""
+    return await _arun_section("education", education_agent.aget_education, state, _validate_education, {"education": []})
 
 
 def get_experience_with_retry(state: State) -> dict:
     """Wrapper for experience agent with validation and retry."""
-    retry_count = state.get("retry_experience", 0)
+    return _run_section("experience", experience_agent.get_experience, state, _validate_experience, {"experience": []})
 
-    result = experience_agent.get_experience(state)
-    output = result.get("experience", "")
 
-    if _validate_experience(output, state["context"]):
-        return {"experience": output, "retry_experience": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"experience": "", "retry_experience": retry_count + 1}
-        else:
-            return {"experience": '{"experience": []}', "retry_experience": 0}
+async def aget_experience_with_retry(state: State) -> dict:
+    """Async wrapper for experience agent with validation and retry."""
+    return await _arun_section("experience", experience_agent.aget_experience, state, _validate_experience, {"experience": []})
 
 
 def get_courses_with_retry(state: State) -> dict:
     """Wrapper for courses agent with validation and retry."""
-    retry_count = state.get("retry_courses", 0)
+    return _run_section("courses", courses_agent.get_courses_certifications, state, _validate_courses, {"courses_and_certifications": []})
 
-    result = courses_agent.get_courses_certifications(state)
-    output = result.get("courses", "")
 
-    if _validate_courses(output, state["context"]):
-        return {"courses": output, "retry_courses": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"courses": "", "retry_courses": retry_count + 1}
-        else:
-            return {"courses": '{"courses_and_certifications": []}', "retry_courses": 0}
+async def aget_courses_with_retry(state: State) -> dict:
+    """Async wrapper for courses agent with validation and retry."""
+    return await _arun_section("courses", courses_agent.aget_courses_certifications, state, _validate_courses, {"courses_and_certifications": []})
 
 
 def get_skills_with_retry(state: State) -> dict:
     """Wrapper for skills agent with validation and retry."""
-    retry_count = state.get("retry_skills", 0)
+    return _run_section("skills", skills_agent.get_skills, state, _validate_skills, {"skills": []})
 
-    result = skills_agent.get_skills(state)
-    output = result.get("skills", "")
 
-    if _validate_skills(output, state["context"]):
-        return {"skills": output, "retry_skills": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"skills": "", "retry_skills": retry_count + 1}
-        else:
-            return {"skills": '{"skills": []}', "retry_skills": 0}
+async def aget_skills_with_retry(state: State) -> dict:
+    """Async wrapper for skills agent with validation and retry."""
+    return await _arun_section("skills", skills_agent.aget_skills, state, _validate_skills, {"skills": []})
 
 
 def get_references_with_retry(state: State) -> dict:
     """Wrapper for references agent with validation and retry."""
-    retry_count = state.get("retry_references", 0)
+    return _run_section("references", references_agent.get_references, state, _validate_references, {"references": []})
 
-    result = references_agent.get_references(state)
-    output = result.get("references", "")
 
-    if _validate_references(output, state["context"]):
-        return {"references": output, "retry_references": 0}
-    else:
-        if retry_count < MAX_RETRIES:
-            return {"references": "", "retry_references": retry_count + 1}
-        else:
-            return {"references": '{"references": []}', "retry_references": 0}
+async def aget_references_with_retry(state: State) -> dict:
+    """Async wrapper for references agent with validation and retry."""
+    return await _arun_section("references", references_agent.aget_references, state, _validate_references, {"references": []})
 
 
 # ===== Conditional Edge Functions =====
 
 def should_retry_name(state: State) -> str:
-    """Decide whether to retry name or proceed."""
+    """Decide whether to retry name or finish the branch."""
     if state.get("retry_name", 0) > 0 and state.get("retry_name", 0) <= MAX_RETRIES:
         return "retry_name"
-    return "proceed_to_personal_info"
+    return "finish"
 
 
 def should_retry_personal_info(state: State) -> str:
-    """Decide whether to retry personal_info or proceed."""
+    """Decide whether to retry personal_info or finish the branch."""
     if state.get("retry_personal_info", 0) > 0 and state.get("retry_personal_info", 0) <= MAX_RETRIES:
         return "retry_personal_info"
-    return "proceed_to_profile"
+    return "finish"
 
 
 def should_retry_profile(state: State) -> str:
-    """Decide whether to retry profile or proceed."""
+    """Decide whether to retry profile or finish the branch."""
     if state.get("retry_profile", 0) > 0 and state.get("retry_profile", 0) <= MAX_RETRIES:
         return "retry_profile"
-    return "proceed_to_education"
+    return "finish"
 
 
 def should_retry_education(state: State) -> str:
-    """Decide whether to retry education or proceed."""
+    """Decide whether to retry education or finish the branch."""
     if state.get("retry_education", 0) > 0 and state.get("retry_education", 0) <= MAX_RETRIES:
         return "retry_education"
-    return "proceed_to_experience"
+    return "finish"
 
 
 def should_retry_experience(state: State) -> str:
-    """Decide whether to retry experience or proceed."""
+    """Decide whether to retry experience or finish the branch."""
     if state.get("retry_experience", 0) > 0 and state.get("retry_experience", 0) <= MAX_RETRIES:
         return "retry_experience"
-    return "proceed_to_courses"
+    return "finish"
 
 
 def should_retry_courses(state: State) -> str:
-    """Decide whether to retry courses or proceed."""
+    """Decide whether to retry courses or finish the branch."""
     if state.get("retry_courses", 0) > 0 and state.get("retry_courses", 0) <= MAX_RETRIES:
         return "retry_courses"
-    return "proceed_to_skills"
+    return "finish"
 
 
 def should_retry_skills(state: State) -> str:
-    """Decide whether to retry skills or proceed."""
+    """Decide whether to retry skills or finish the branch."""
     if state.get("retry_skills", 0) > 0 and state.get("retry_skills", 0) <= MAX_RETRIES:
         return "retry_skills"
-    return "proceed_to_references"
+    return "finish"
 
 
 def should_retry_references(state: State) -> str:
-    """Decide whether to retry references or finish."""
+    """Decide whether to retry references or finish the branch."""
     if state.get("retry_references", 0) > 0 and state.get("retry_references", 0) <= MAX_RETRIES:
         return "retry_references"
     return "finish"
 
-def parse(input_of_user: str) -> dict:
+
+# Section key -> (node name, wrapper node, async wrapper node, retry router).
+# Every section only reads state["context"], so the sections are independent
+# branches: they all start at START and join at END.
+SECTIONS = {
+    "name": ("get_name", get_name_with_retry, aget_name_with_retry, should_retry_name),
+    "personal_info": ("get_personal_info", get_personal_info_with_retry, aget_personal_info_with_retry, should_retry_personal_info),
+    "profile": ("get_profile", get_profile_with_retry, aget_profile_with_retry, should_retry_profile),
+    "education": ("get_education", get_education_with_retry, aget_education_with_retry, should_retry_education),
+    "experience": ("get_experience", get_experience_with_retry, aget_experience_with_retry, should_retry_experience),
+    "courses": ("get_courses", get_courses_with_retry, aget_courses_with_retry, should_retry_courses),
+    "skills": ("get_skills", get_skills_with_retry, aget_skills_with_retry, should_retry_skills),
+    "references": ("get_references", get_references_with_retry, aget_references_with_retry, should_retry_references),
+}
+
+
+def build_graph(use_async: bool = False, sections: Optional[Tuple[str, ...]] = None):
     """
     🔹 Purpose:
-        Main function to parse user input and generate a structured resume.
-        Includes validation and retry logic for each agent.
+        Build and compile the extraction workflow.
+        Every section agent runs as its own branch (fan-out from START,
+        fan-in at END), each with its own retry loop.
 
     🔹 Parameters:
-        input_of_user: str - Raw user input containing personal and professional details.
+        use_async: bool - Use the async wrapper nodes (for parse_async).
+        sections: tuple - Only build branches for these sections (default: all).
 
     🔹 Returns:
-        dict - Structured resume data including skills, education, experience, references, personal info, and profile.
+        The compiled LangGraph workflow.
     """
 
     # Build workflow with retry logic
     workflow = StateGraph(State)
 
-    # Add nodes using wrapper functions with validation
-    workflow.add_node("get_name", get_name_with_retry)
-    workflow.add_node("get_personal_info", get_personal_info_with_retry)
-    workflow.add_node("get_profile", get_profile_with_retry)
-    workflow.add_node("get_education", get_education_with_retry)
-    workflow.add_node("get_experience", get_experience_with_retry)
-    workflow.add_node("get_courses", get_courses_with_retry)
-    workflow.add_node("get_skills", get_skills_with_retry)
-    workflow.add_node("get_references", get_references_with_retry)
-
-    # Start -> name (first extract the name)
-    workflow.add_edge(START, "get_name")
-
-    # name -> conditional (retry or proceed to personal_info)
-    workflow.add_conditional_edges(
-        "get_name",
-        should_retry_name,
-        {
-            "retry_name": "get_name",
-            "proceed_to_personal_info": "get_personal_info"
-        }
-    )
-
-    # personal_info -> conditional (retry or proceed to profile)
-    workflow.add_conditional_edges(
-        "get_personal_info",
-        should_retry_personal_info,
-        {
-            "retry_personal_info": "get_personal_info",
-            "proceed_to_profile": "get_profile"
-        }
-    )
-
-    # profile -> conditional (retry or proceed to education)
-    workflow.add_conditional_edges(
-        "get_profile",
-        should_retry_profile,
-        {
-            "retry_profile": "get_profile",
-            "proceed_to_education": "get_education"
-        }
-    )
-
-    # education -> conditional (retry or proceed to experience)
-    workflow.add_conditional_edges(
-        "get_education",
-        should_retry_education,
-        {
-            "retry_education": "get_education",
-            "proceed_to_experience": "get_experience"
-        }
-    )
-
-    # experience -> conditional (retry or proceed to courses)
-    workflow.add_conditional_edges(
-        "get_experience",
-        should_retry_experience,
-        {
-            "retry_experience": "get_experience",
-            "proceed_to_courses": "get_courses"
-        }
-    )
-
-    # courses -> conditional (retry or proceed to skills)
-    workflow.add_conditional_edges(
-        "get_courses",
-        should_retry_courses,
-        {
-            "retry_courses": "get_courses",
-            "proceed_to_skills": "get_skills"
-        }
-    )
-
-    # skills -> conditional (retry or proceed to references)
-    workflow.add_conditional_edges(
-        "get_skills",
-        should_retry_skills,
-        {
-            "retry_skills": "get_skills",
-            "proceed_to_references": "get_references"
-        }
-    )
-
-    # references -> conditional (retry or finish)
-    workflow.add_conditional_edges(
-        "get_references",
-        should_retry_references,
-        {
-            "retry_references": "get_references",
-            "finish": END
-        }
-    )
+    for section, (node, wrapper, async_wrapper, router) in SECTIONS.items():
+        if sections is not None and section not in sections:
+            continue
+
+        # Add node using wrapper function with validation
+        workflow.add_node(node, async_wrapper if use_async else wrapper)
+
+        # Start -> section (all sections start together)
+        workflow.add_edge(START, node)
+
+        # section -> conditional (retry the same section or finish the branch)
+        workflow.add_conditional_edges(
+            node,
+            router,
+            {
+                f"retry_{section}": node,
+                "finish": END
+            }
+        )
+
+    return workflow.compile()
+
+
+# Compiled workflows shared by every request in this process (keyed by use_async, sections)
+_graphs: Dict[Tuple[bool, Tuple[str, ...]], Any] = {}
+_graph_lock = threading.Lock()
+
+
+def get_graph(use_async: bool = False, sections: Optional[Iterable[str]] = None):
+    """
+    Return the process-wide compiled workflow, building it on first use.
+    Pass sections to get a workflow that only runs those section branches.
+    """
+    sections = tuple(s for s in SECTIONS if sections is None or s in sections)
+    key = (use_async, sections)
+    graph = _graphs.get(key)
+    if graph is None:
+        with _graph_lock:
+            graph = _graphs.get(key)
+            if graph is None:
+                graph = _graphs[key] = build_graph(use_async, sections)
+    return graph
+
+
+def reset_graph() -> None:
+    """
+    Drop the compiled workflows so the next call rebuilds them.
+    Call this after replacing agents or wrapper nodes (e.g. in tests).
+    MAX_RETRIES is read by the edge functions at run time and needs no rebuild.
+    """
+    with _graph_lock:
+        _graphs.clear()
 
-    chain = workflow.compile()
 
-    # Initialize state with user input and zero retry counters
-    initial_state = {
+def _initial_state(input_of_user: str, deadline_at: Optional[float] = None) -> dict:
+    # Initialize state with user input, each agent's slice of it, the deadline and zero retry counters
+    slices = {}
+    if getattr(settings, "PARSER_SEGMENTATION", True):
+        slices = segment(input_of_user, SECTIONS)
+    return {
         "context": input_of_user,
+        "slices": slices,
+        "shared_sections": [],
+        "deadline_at": deadline_at,
+        "missing": [],
+        "exhausted": [],
         "retry_name": 0,
         "retry_personal_info": 0,
         "retry_profile": 0,
@@ -609,21 +770,310 @@ def parse(input_of_user: str) -> dict:
         "retry_references": 0,
     }
 
-    state = chain.invoke(initial_state)
 
+# ===== Single-call mode =====
+
+def _split_single_call(output: str, context: str) -> Dict[str, Any]:
+    """
+    Split the single-call agent's JSON into per-section objects in the shape
+    each section agent returns, and keep only the sections that validate.
+    """
+    data = _parse_json(output)
+    if data is _INVALID:
+        data = repair_json_value(output)
+    if not isinstance(data, dict):
+        return {}
+
+    candidates = {}
+    if "name" in data:
+        candidates["name"] = {"name": data["name"]}
+    if "profile" in data:
+        candidates["personal_info"] = {"profile": data["profile"]}
+    if isinstance(data.get("summary"), str):
+        candidates["profile"] = data["summary"].strip()
+    for section, key in (("education", "education"), ("experience", "experience"),
+                         ("courses", "courses_and_certifications"),
+                         ("skills", "skills"), ("references", "references")):
+        if key in data:
+            candidates[section] = {key: data[key]}
+
+    valid = {}
+    for section, section_output in candidates.items():
+        if VALIDATORS[section](section_output, context):
+            valid[section] = _ground(section, section_output, context)
+    metrics.incr("parser.single.valid_sections", len(valid))
+    metrics.incr("parser.single.fallback_sections", len(SECTIONS) - len(valid))
+    return valid
+
+
+# ===== Rule-based header =====
+
+def _rule_based_sections(context: str) -> Dict[str, Any]:
+    """
+    Fill name and personal_info from patterns in the text when the name is
+    found with high confidence, so their agents don't have to run.
+    personal_info also needs an e-mail address: without one the contact block
+    is likely incomplete and is left to the agent.
+    """
+    if not getattr(settings, "PARSER_RULE_EXTRACTION", True):
+        return {}
+    contacts = extract_contacts(context)
+    name, confidence = extract_name(context, contacts)
+    if not name or confidence < RULE_MIN_CONFIDENCE:
+        return {}
+
+    sections = {"name": {"name": name}}
+    if contacts["email"]:
+        first, _, surname = name.partition(" ")
+        sections["personal_info"] = {"profile": {
+            "name": first,
+            "surname": surname or None,
+            "position": None,
+            "description": None,
+            "phone_number": contacts["phone"],
+            "accounts": {
+                "email": contacts["email"],
+                "github": contacts["github"],
+                "linkedin": contacts["linkedin"],
+            },
+        }}
+    for section in sections:
+        metrics.incr(f"parser.rules.{section}")
+    return sections
+
+
+def _apply_rules(state: dict) -> Dict[str, Any]:
+    """Add the rule-based sections the state doesn't have yet; return the ones added."""
+    added = {section: value for section, value in _rule_based_sections(state["context"]).items()
+             if section not in state}
+    state.update(added)
+    return added
+
+
+# ===== Long inputs =====
+
+def _long_input_chunks(input_of_user: str) -> List[str]:
+    """
+    The input as one chunk, or as overlapping chunks once it is longer than
+    PARSER_LONG_INPUT_TOKENS (see resume/utils/chunking.py).
+    """
+    tokens = approx_tokens(input_of_user)
+    if tokens <= getattr(settings, "PARSER_LONG_INPUT_TOKENS", 6000):
+        return [input_of_user]
+    chunk_tokens = max(getattr(settings, "PARSER_CHUNK_TOKENS", 3000), math.ceil(tokens / MAX_CHUNKS))
+    overlap_tokens = getattr(settings, "PARSER_CHUNK_OVERLAP_TOKENS", 200)
+    return split_chunks(input_of_user, chunk_tokens, overlap_tokens)
+
+
+def _chunk_states(chunks: List[str], deadline_at: Optional[float],
+                  reuse: Optional[Dict[str, Any]] = None) -> List[dict]:
+    """
+    Initial states for each chunk. Header sections (name, personal_info,
+    profile) are only extracted from the first chunk, where they live;
+    the later chunks run the list sections only. Reused sections run in
+    no chunk (_merge_chunk_states puts them back).
+    """
+    states = [_initial_state(chunk, deadline_at) for chunk in chunks]
+    for state in states[1:]:
+        state.update({section: None for section in SECTIONS if section not in LIST_SECTIONS})
+    for state in states:
+        state.update({section: None for section in reuse or ()})
+    return states
+
+
+def _chunk_slots(config: dict, chunks: int) -> int:
+    """
+    How many chunks run at once. Each chunk is a full workflow running up to
+    max_concurrency agents, so chunks share that cap instead of multiplying it.
+    """
+    return max(1, min(chunks, config["max_concurrency"] // len(SECTIONS)))
+
+
+def _run_chunk(state: dict, config: dict) -> dict:
+    """Extract one chunk on a pool thread."""
+    token = _workflow_thread.set(threading.get_ident())
+    try:
+        return _run_pending(state, "graph", config)
+    finally:
+        _workflow_thread.reset(token)
+        # The response cache opened a connection for this thread
+        connections.close_all()
+
+
+def _merge_chunk_states(states: List[dict], input_of_user: str,
+                        reuse: Optional[Dict[str, Any]] = None) -> dict:
+    state = merge_states(states)
+    if reuse:
+        state.update(reuse)
+        metrics.incr("parser.incremental.reused", len(reuse))
+    state.update(context=input_of_user, slices={}, shared_sections=[],
+                 missing=sorted({section for s in states for section in s.get("missing", [])}),
+                 exhausted=sorted({section for s in states for section in s.get("exhausted", [])}))
+    metrics.incr("parser.long.chunks", len(states))
     return state
 
-# ===== Helper functions for normalization =====
-def _loads(maybe_json: Any) -> Any:
-    if isinstance(maybe_json, str):
-        s = maybe_json.strip()
-        if (s.startswith("{") and s.endswith("}")) or (s.startswith("[") and s.endswith("]")):
-            try:
-                return json.loads(s)
-            except Exception:
-                return maybe_json
-    return maybe_json
 
+def _deadline_at(timeout: Optional[float]) -> Optional[float]:
+    if timeout is None:
+        timeout = getattr(settings, "PARSER_DEADLINE_SECONDS", 90)
+    return deadline.deadline_in(timeout)
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = mode or getattr(settings, "PARSER_MODE", "graph")
+    if mode not in PARSER_MODES:
+        raise ValueError(f"Unknown parser mode: {mode}")
+    return mode
+
+
+def _run_pending(state: dict, mode: str, config: dict) -> dict:
+    """Fill the state's missing sections: single call (if asked), rules, then the graph."""
+    if mode == "single":
+        try:
+            with deadline.within(state.get("deadline_at")):
+                result = resume_agent.get_resume(state)
+        except deadline.DeadlineExceeded:
+            result = {}
+        state.update(_split_single_call(result.get("resume", ""), state["context"]))
+    _apply_rules(state)
+
+    pending = [section for section in SECTIONS if section not in state]
+    if pending:
+        _share_prefix(state, pending)
+        state = get_graph(sections=pending).invoke(state, config=config)
+    return state
+
+
+async def _arun_pending(state: dict, mode: str, config: dict) -> dict:
+    """Async variant of _run_pending."""
+    if mode == "single":
+        try:
+            with deadline.within(state.get("deadline_at")):
+                result = await resume_agent.aget_resume(state)
+        except deadline.DeadlineExceeded:
+            result = {}
+        state.update(_split_single_call(result.get("resume", ""), state["context"]))
+    _apply_rules(state)
+
+    pending = [section for section in SECTIONS if section not in state]
+    if pending:
+        _share_prefix(state, pending)
+        state = await get_graph(use_async=True, sections=pending).ainvoke(state, config=config)
+    return state
+
+
+def parse(input_of_user: str, max_concurrency: Optional[int] = None, mode: Optional[str] = None,
+          reuse: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> dict:
+    """
+    🔹 Purpose:
+        Main function to parse user input and generate a structured resume.
+        Includes validation and retry logic for each agent.
+
+        mode="graph":  runs the shared compiled workflow (one agent per section),
+                       so wall time approaches the slowest single section.
+        mode="single": extracts every section in one LLM call, then runs the
+                       per-section agents only for sections that fail validation.
+
+        In both modes a name and contact block stated plainly in the text
+        ("I'm Ada Lovelace, ada@lovelace.dev") is filled by rules instead of agents.
+        Section agents only see the part of the input routed to them
+        (resume/utils/segmenter.py); validation still checks the full text.
+
+        Inputs longer than PARSER_LONG_INPUT_TOKENS are split into overlapping
+        chunks that are extracted in graph mode and merged. Chunks share the
+        max_concurrency cap: max_concurrency // len(SECTIONS) of them run at
+        once, so wall time stays close to that of a single chunk only when
+        the cap leaves room for every chunk.
+
+    🔹 Parameters:
+        input_of_user: str - Raw user input containing personal and professional details.
+        max_concurrency: int - Maximum number of agents running at once
+                               (defaults to MAX_CONCURRENCY).
+        mode: str - "graph" or "single" (defaults to settings.PARSER_MODE).
+        reuse: dict - Section outputs kept from a previous parse of an earlier
+                      version of the text; those sections are not extracted again.
+        timeout: float - Time budget in seconds (defaults to settings.PARSER_DEADLINE_SECONDS).
+                         Agent calls and retries that can't finish in time are dropped and
+                         their sections are listed under "missing" with empty values.
+
+    🔹 Returns:
+        dict - Structured resume data including skills, education, experience, references, personal info, and profile.
+    """
+
+    mode = _resolve_mode(mode)
+    config = {"max_concurrency": max_concurrency or MAX_CONCURRENCY}
+    start = time.monotonic()
+    deadline_at = _deadline_at(timeout)
+
+    chunks = _long_input_chunks(input_of_user)
+    if len(chunks) > 1:
+        mode = "long"
+        with ThreadPoolExecutor(max_workers=_chunk_slots(config, len(chunks))) as pool:
+            states = list(pool.map(lambda state: _run_chunk(state, config),
+                                   _chunk_states(chunks, deadline_at, reuse)))
+        state = _merge_chunk_states(states, input_of_user, reuse)
+    else:
+        state = _initial_state(input_of_user, deadline_at)
+        if reuse:
+            # Only a few sections are left, one call each beats re-extracting everything
+            mode = "graph" if mode == "single" else mode
+            state.update(reuse)
+            metrics.incr("parser.incremental.reused", len(reuse))
+        token = _workflow_thread.set(threading.get_ident())
+        try:
+            state = _run_pending(state, mode, config)
+        finally:
+            _workflow_thread.reset(token)
+
+    metrics.incr(f"parser.{mode}.runs")
+    metrics.incr(f"parser.{mode}.seconds", time.monotonic() - start)
+    return state
+
+
+async def parse_async(input_of_user: str, max_concurrency: Optional[int] = None, mode: Optional[str] = None,
+                      reuse: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> dict:
+    """
+    🔹 Purpose:
+        Async variant of parse(). Agents await the shared async LLM client,
+        so one worker process can serve many extractions at once.
+
+    🔹 Parameters:
+        Same as parse().
+
+    🔹 Returns:
+        dict - Same structure as parse().
+    """
+
+    mode = _resolve_mode(mode)
+    config = {"max_concurrency": max_concurrency or MAX_CONCURRENCY}
+    start = time.monotonic()
+    deadline_at = _deadline_at(timeout)
+
+    chunks = _long_input_chunks(input_of_user)
+    if len(chunks) > 1:
+        mode = "long"
+        slots = asyncio.Semaphore(_chunk_slots(config, len(chunks)))
+
+        async def run_chunk(state: dict) -> dict:
+            async with slots:
+                return await _arun_pending(state, "graph", config)
+
+        states = await asyncio.gather(*[run_chunk(state) for state in _chunk_states(chunks, deadline_at, reuse)])
+        state = _merge_chunk_states(states, input_of_user, reuse)
+    else:
+        state = _initial_state(input_of_user, deadline_at)
+        if reuse:
+            # Only a few sections are left, one call each beats re-extracting everything
+            mode = "graph" if mode == "single" else mode
+            state.update(reuse)
+            metrics.incr("parser.incremental.reused", len(reuse))
+        state = await _arun_pending(state, mode, config)
+
+    metrics.incr(f"parser.{mode}.runs")
+    metrics.incr(f"parser.{mode}.seconds", time.monotonic() - start)
+    return state
+
+# ===== Helper functions for normalization =====
 def _build_contacts(pi: Dict[str, Any]) -> Dict[str, Optional[str]]:
     prof = (pi or {}).get("profile") or {}
     acc = prof.get("accounts") or {}
@@ -643,6 +1093,14 @@ def _derive_highest_degree(edu_list: List[Dict[str, Any]]) -> Optional[str]:
             return it.get("education")
     return edu_list[0].get("education")
 
+def _derive_title(exp_list: List[Dict[str, Any]]) -> Optional[str]:
+    # Most recent position when personal_info has none (e.g. it was filled by rules)
+    for it in exp_list:
+        position = (it.get("position_or_company") or "").split(" at ")[0].strip()
+        if position:
+            return position
+    return None
+
 def _collect_key_skills(sections: List[Dict[str, Any]], k: int = 5) -> List[str]:
     flat: List[str] = []
     for sec in sections:
@@ -656,16 +1114,8 @@ def _collect_key_skills(sections: List[Dict[str, Any]], k: int = 5) -> List[str]
         if len(out) >= k: break
     return out
 
-# ===== 3) Normalize raw_dict to what the template expects =====
-def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
-    name_json    = _loads(raw.get("name"))
-    skills_json  = _loads(raw.get("skills"))
-    edu_json     = _loads(raw.get("education"))
-    exp_json     = _loads(raw.get("experience"))
-    refs_json    = _loads(raw.get("references"))
-    pi_json      = _loads(raw.get("personal_info"))
-    courses_json = _loads(raw.get("courses"))
-
+# ===== Per-section normalizers (shared by normalize() and the event stream) =====
+def _normalize_skills(skills_json: Any) -> List[Dict[str, Any]]:
     # Skills -> sections
     sections = []
     if isinstance(skills_json, dict) and isinstance(skills_json.get("skills"), list):
@@ -675,58 +1125,108 @@ def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
                 "items": sec.get("skills") or [],
                 "note": sec.get("explanation"),
             })
-    skills_out = {"sections": sections} if sections else None
+    return sections
 
-    # Education
-    education_out = None
+def _normalize_education(edu_json: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(edu_json, dict) and isinstance(edu_json.get("education"), list):
-        education_out = [{
+        return [{
             "education": it.get("education"),
             "date": it.get("date"),
             "description": it.get("description"),
         } for it in edu_json["education"]]
+    return None
 
-    # Experience
-    experience_out = None
+def _normalize_experience(exp_json: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(exp_json, dict) and isinstance(exp_json.get("experience"), list):
-        experience_out = [{
+        return [{
             "position_or_company": it.get("position_or_company"),
             "date": it.get("date"),
             "description": it.get("description"),
         } for it in exp_json["experience"]]
+    return None
 
-    # Courses and Certifications
-    courses_out = None
+def _normalize_courses(courses_json: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(courses_json, dict) and isinstance(courses_json.get("courses_and_certifications"), list):
-        courses_out = [{
+        return [{
             "course_or_certificate": it.get("course_or_certificate"),
             "date": it.get("date"),
             "description": it.get("description"),
         } for it in courses_json["courses_and_certifications"]]
+    return None
 
-    # References
-    references_out = None
+def _normalize_references(refs_json: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(refs_json, dict) and isinstance(refs_json.get("references"), list):
-        references_out = [{
+        return [{
             "name": it.get("name"),
             "relationship_or_title": it.get("relationship_or_title"),
             "contact": it.get("contact"),
         } for it in refs_json["references"]]
+    return None
 
-    # Extract name from name_agent (priority) or fallback to personal_info
-    name = None
+def _normalize_name(name_json: Any) -> Optional[str]:
     if isinstance(name_json, dict) and name_json.get("name"):
-        name = name_json.get("name")
+        return name_json.get("name")
+    return None
 
-    # Header name/title + contacts from personal_info
-    title, contacts = None, None
+def _normalize_personal_info(pi_json: Any) -> Dict[str, Any]:
+    """Header fields (fallback name, title, contacts) from the personal_info agent."""
     if isinstance(pi_json, dict) and isinstance(pi_json.get("profile"), dict):
         p = pi_json["profile"]
-        # Use name from name_agent if available, otherwise fallback to personal_info
-        if not name:
-            name = " ".join([x for x in [p.get("name"), p.get("surname")] if x]) or None
-        title = p.get("position")
-        contacts = _build_contacts(pi_json)
+        return {
+            "name": " ".join([x for x in [p.get("name"), p.get("surname")] if x]) or None,
+            "title": p.get("position"),
+            "contacts": _build_contacts(pi_json),
+        }
+    return {"name": None, "title": None, "contacts": None}
+
+def _strip_empty(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    # strip empties
+    def _empty(v: Any) -> bool: return v in (None, [], {})
+    return {k: v for k, v in ctx.items() if not _empty(v)}
+
+def normalize_section(section: str, value: Any) -> Dict[str, Any]:
+    """
+    Normalize a single section in the shape normalize() produces for it,
+    so partial results can be sent to the client as soon as they settle.
+    """
+    if section == "name":
+        out = {"name": _normalize_name(value)}
+    elif section == "personal_info":
+        pi = _normalize_personal_info(value)
+        out = {"title": pi["title"], "contacts": pi["contacts"]}
+    elif section == "profile":
+        out = {"profile": _strip_empty({"summary": value or None})}
+    elif section == "skills":
+        sections = _normalize_skills(value)
+        out = {"skills": {"sections": sections} if sections else None}
+    elif section == "education":
+        out = {"education": _normalize_education(value)}
+    elif section == "experience":
+        out = {"experience": _normalize_experience(value)}
+    elif section == "courses":
+        out = {"courses": _normalize_courses(value)}
+    elif section == "references":
+        out = {"references": _normalize_references(value)}
+    else:
+        raise ValueError(f"Unknown section: {section}")
+    return _strip_empty(out)
+
+# ===== 3) Normalize raw_dict to what the template expects =====
+def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
+    # raw holds the parsed section objects from the graph state, no JSON decoding here
+    sections       = _normalize_skills(raw.get("skills"))
+    skills_out     = {"sections": sections} if sections else None
+    education_out  = _normalize_education(raw.get("education"))
+    experience_out = _normalize_experience(raw.get("experience"))
+    courses_out    = _normalize_courses(raw.get("courses"))
+    references_out = _normalize_references(raw.get("references"))
+
+    # Header name/title + contacts from personal_info
+    pi = _normalize_personal_info(raw.get("personal_info"))
+    title, contacts = pi["title"] or _derive_title(experience_out or []), pi["contacts"]
+
+    # Extract name from name_agent (priority) or fallback to personal_info
+    name = _normalize_name(raw.get("name")) or pi["name"]
 
     # Profile object for the template
     highest_degree = _derive_highest_degree(education_out or [])
@@ -749,18 +1249,100 @@ def normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
         "experience": experience_out,
         "courses": courses_out,
         "references": references_out,
+        # Sections the time budget cut short, so the client can offer to retry them
+        "missing": [s for s in SECTIONS if s in (raw.get("missing") or [])],
     }
-    # strip empties
-    def _empty(v: Any) -> bool: return v in (None, [], {})
-    return {k: v for k, v in ctx.items() if not _empty(v)}
+    return _strip_empty(ctx)
 
 
 #--------function to parse the input-----------
 
-def parse_resume_input(raw_input: str) -> dict:
-    parsed_data = parse(raw_input)
+def parse_resume_input(raw_input: str, mode: Optional[str] = None) -> dict:
+    parsed_data = parse(raw_input, mode=mode)
+    normalized_data = normalize(parsed_data)
+    return normalized_data
+
+
+async def parse_resume_input_async(raw_input: str, mode: Optional[str] = None) -> dict:
+    parsed_data = await parse_async(raw_input, mode=mode)
     normalized_data = normalize(parsed_data)
     return normalized_data
 
-    
-    
\ No newline at end of file
+
+def section_outputs(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The per-section parser outputs of a parse, as stored in ResumeModel.sections.
+    Sections the deadline cut short or that ran out of retries hold an empty
+    fallback rather than an extraction; they are left out so the next parse
+    extracts them again.
+    """
+    empty = set(state.get("missing") or []) | set(state.get("exhausted") or [])
+    return {section: None if section in empty else state.get(section) for section in SECTIONS}
+
+
+async def reparse_resume_input_async(raw_input: str, previous_input: Optional[str] = None,
+                                     previous_sections: Optional[Dict[str, Any]] = None,
+                                     mode: Optional[str] = None) -> Tuple[dict, dict]:
+    """
+    Parse an edited version of a previous input, extracting again only the
+    sections whose paragraphs changed. Returns (normalized data, section outputs).
+    """
+    reuse = reusable_sections(previous_input, previous_sections, raw_input, SECTIONS)
+    parsed_data = await parse_async(raw_input, mode=mode, reuse=reuse)
+    return normalize(parsed_data), section_outputs(parsed_data)
+
+
+async def extract_for_user_async(user_id: int, raw_input: str, mode: Optional[str] = None) -> Tuple[dict, dict]:
+    """
+    reparse_resume_input_async() against the user's previous submission.
+    Identical concurrent requests (same user, input and mode) share one run,
+    within this process and across processes. Returns (normalized data, section outputs).
+    """
+    async def run():
+        previous_input, previous_sections = await alatest_sections(user_id)
+        return await reparse_resume_input_async(raw_input, previous_input, previous_sections, mode=mode)
+
+    key = singleflight.make_key("extract", user_id, _resolve_mode(mode), raw_input)
+    return await singleflight.coalesce(key, run)
+
+
+async def stream_resume_input_async(raw_input: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    🔹 Purpose:
+        Run the extraction workflow and yield each section as soon as it
+        passes validation (or falls back after MAX_RETRIES).
+
+    🔹 Yields:
+        ("section", (section name, normalized section)) for every section, then
+        ("done", full normalize() result) once all branches have joined.
+    """
+    if len(_long_input_chunks(raw_input)) > 1:
+        # Chunks are merged at the end, so there are no earlier partial results
+        state = await parse_async(raw_input)
+        for section in SECTIONS:
+            yield "section", {"section": section, "data": normalize_section(section, state.get(section))}
+        yield "done", normalize(state)
+        return
+
+    config = {"max_concurrency": MAX_CONCURRENCY}
+    state = _initial_state(raw_input, _deadline_at(None))
+    for section, value in _apply_rules(state).items():
+        yield "section", {"section": section, "data": normalize_section(section, value)}
+
+    pending = [section for section in SECTIONS if section not in state]
+    _share_prefix(state, pending)
+    chain = get_graph(use_async=True, sections=pending)
+    async for chunk in chain.astream(state, config=config, stream_mode="updates"):
+        for update in chunk.values():
+            if not update:
+                continue
+            # "missing" and "exhausted" are reducer keys (operator.add): the update only holds this branch's part
+            missing = state.get("missing", []) + update.get("missing", [])
+            exhausted = state.get("exhausted", []) + update.get("exhausted", [])
+            state.update(update, missing=missing, exhausted=exhausted)
+            for section in SECTIONS:
+                # A zero retry counter next to the output means the section settled
+                if section in update and update.get(f"retry_{section}") == 0:
+                    yield "section", {"section": section, "data": normalize_section(section, update[section])}
+
+    yield "done", normalize(state)
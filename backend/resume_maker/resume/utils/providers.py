@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from django.conf import settings
+from dotenv import load_dotenv
+from openai import APITimeoutError, AsyncOpenAI, InternalServerError, OpenAI
+
+from . import deadline
+
+# LLM providers behind the gateway in llm.py, selected by settings.LLM_PROVIDER:
+#   "openai": OpenAI, or any server implementing its Responses API at
+#             LLM_BASE_URL (a self-hosted model, `manage.py run_llm_stub`)
+#   "fake":   in-process, deterministic schema-valid answers; no network
+# Providers raise the openai SDK's exception types, which is what the retry
+# and circuit breaker logic in resilience.py understands.
+
+# Load environment variables from .env file
+load_dotenv()
+
+# First message of a prompt laid out for prefix caching (see _messages)
+CONTEXT_PREAMBLE = (
+    "The user's text follows between ---TEXT START--- and ---TEXT END---. "
+    "The instructions for this request come after the text; follow them exactly."
+)
+
+# Connection pool tuning (shared by every agent in the process)
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+Usage = Dict[str, int]
+
+
+class Provider:
+    """
+    Sends one prompt to a model. complete() returns the answer's text and its
+    token usage ({"input_tokens": ..., "output_tokens": ..., "cached_tokens": ...}).
+    With a schema the answer must be JSON matching it; without one it is plain text.
+    A context is sent ahead of both prompts (see _messages).
+    """
+
+    def complete(self, model: str, system_prompt: str, user_prompt: str,
+                 schema: Optional[dict], context: Optional[str] = None) -> Tuple[str, Usage]:
+        raise NotImplementedError
+
+    async def acomplete(self, model: str, system_prompt: str, user_prompt: str,
+                        schema: Optional[dict], context: Optional[str] = None) -> Tuple[str, Usage]:
+        raise NotImplementedError
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _messages(system_prompt: str, user_prompt: str, context: Optional[str] = None) -> list:
+    """
+    The prompt's messages. Providers cache prompts by prefix, so a context shared
+    by several calls goes first, after a fixed preamble, and the call's own
+    instructions last: calls with the same context then differ only at the end.
+    """
+    if context is None:
+        return [
+            {"role": "system", "content": f"{system_prompt}"},
+            {"role": "user", "content": f"{user_prompt}"},
+        ]
+    return [
+        {"role": "system", "content": CONTEXT_PREAMBLE},
+        {"role": "user", "content": f"---TEXT START---\n{context}\n---TEXT END---"},
+        {"role": "system", "content": f"{system_prompt}"},
+        {"role": "user", "content": f"{user_prompt}"},
+    ]
+
+
+def _cache_key(context: Optional[str]) -> dict:
+    """Route calls sharing a context to the same prompt cache (prompt_cache_key)."""
+    if context is None:
+        return {}
+    return {"prompt_cache_key": hashlib.sha256(context.encode("utf-8")).hexdigest()[:32]}
+
+
+def _usage(resp) -> Usage:
+    usage = getattr(resp, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        # Input tokens served from the provider's prompt cache (billed at a discount)
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+    }
+
+
+def _text_format(schema: Optional[dict]) -> dict:
+    """Request a strict JSON-schema response instead of relying on the prompt alone."""
+    if schema is None:
+        return {}
+    return {
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "extraction",
+                "schema": schema,
+                "strict": True,
+            }
+        }
+    }
+
+
+def _bounded(client):
+    """The client, with its timeout cut to the request's remaining budget if it has one."""
+    budget = deadline.timeout(TIMEOUT)
+    if deadline.remaining() is None:
+        return client
+    return client.with_options(timeout=budget)
+
+
+class OpenAIProvider(Provider):
+    """
+    The Responses API over pooled HTTP clients: one blocking client per process
+    and one async client per event loop (httpx async pools are bound to the
+    loop that opened them). The SDK's own retries are off; see resilience.py.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url
+        self._client: Optional[OpenAI] = None
+        self._client_lock = threading.Lock()
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def client(self) -> OpenAI:
+        """Return the process-wide blocking client."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = OpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        base_url=self.base_url,
+                        timeout=TIMEOUT,
+                        max_retries=0,
+                        http_client=httpx.Client(limits=_limits(), timeout=TIMEOUT),
+                    )
+        return self._client
+
+    def async_client(self) -> AsyncOpenAI:
+        """Return the async client shared by every coroutine on the running loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=self.base_url,
+                timeout=TIMEOUT,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=_limits(), timeout=TIMEOUT),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def complete(self, model, system_prompt, user_prompt, schema, context=None):
+        # The timeout is re-sized to the remaining budget before every attempt
+        resp = _bounded(self.client()).responses.create(
+            model=model,
+            input=_messages(system_prompt, user_prompt, context),
+            **_text_format(schema),
+            **_cache_key(context),
+        )
+        return resp.output[0].content[0].text, _usage(resp)
+
+    async def acomplete(self, model, system_prompt, user_prompt, schema, context=None):
+        resp = await _bounded(self.async_client()).responses.create(
+            model=model,
+            input=_messages(system_prompt, user_prompt, context),
+            **_text_format(schema),
+            **_cache_key(context),
+        )
+        return resp.output[0].content[0].text, _usage(resp)
+
+
+# Canned answers (shared by FakeProvider and the run_llm_stub command)
+
+_TEXT = re.compile(r"---TEXT START---\n(.*?)\n---TEXT END---", re.S)
+_WORD = re.compile(r"[^\W\d_][\w'-]*")
+# Fields a canned answer leaves empty: made-up contact details would only be scrubbed by grounding
+_CONTACT_FIELDS = ("email", "phone", "github", "linkedin", "contact", "url")
+
+
+def _input_text(user_prompt: str) -> str:
+    match = _TEXT.search(user_prompt)
+    return match.group(1) if match else user_prompt
+
+
+def _phrase(words: list, path: str, length: int) -> str:
+    """A few consecutive words of the input, picked by a hash of the field's path."""
+    if not words:
+        return "Not specified"
+    start = int(hashlib.sha1(path.encode("utf-8")).hexdigest(), 16) % len(words)
+    return " ".join(words[start:start + length] or words[:length])
+
+
+def _instance(schema: dict, words: list, path: str) -> Any:
+    if "anyOf" in schema:
+        # A nullable field (the section agents' shared schema): fill it in
+        return _instance(schema["anyOf"][0], words, path)
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+    if "object" in types:
+        return {
+            key: _instance(prop, words, f"{path}.{key}")
+            for key, prop in schema.get("properties", {}).items()
+        }
+    if "array" in types:
+        return [_instance(schema.get("items", {}), words, f"{path}[{i}]") for i in range(2)]
+    if "null" in types and any(field in path.rsplit(".", 1)[-1] for field in _CONTACT_FIELDS):
+        return None
+    if "string" in types:
+        return _phrase(words, path, 12 if path.endswith(("description", "explanation", "summary")) else 3)
+    if "integer" in types or "number" in types:
+        return 0
+    if "boolean" in types:
+        return False
+    return None
+
+
+def canned_answer(system_prompt: str, user_prompt: str, schema: Optional[dict]) -> str:
+    """A deterministic answer built from the words of the input: schema-valid JSON, or text without a schema."""
+    words = _WORD.findall(_input_text(user_prompt))
+    if schema is None:
+        return f"I am a professional whose background includes {_phrase(words, 'summary', 12)}."
+    return json.dumps(_instance(schema, words, "$"))
+
+
+def prompt_text(schema: Optional[dict], messages: list) -> str:
+    """A prompt as the provider reads it, for prefix matching: the schema comes before the messages."""
+    return (json.dumps(schema) if schema is not None else "") + "".join(m.get("content", "") for m in messages)
+
+
+class PrefixCache:
+    """
+    Stand-in for a provider's prompt cache: a prompt of at least MIN_TOKENS reuses
+    the longest prefix, in STEP-token increments, sent before (up to `size` prefixes).
+    """
+
+    MIN_TOKENS = 1024
+    STEP = 128
+
+    def __init__(self, size: int = 10000):
+        self.size = size
+        self._seen: Dict[str, None] = {}
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, prompt: str) -> int:
+        digest = hashlib.sha1()
+        prefixes = []
+        # Approx. 4 chars/token, like the rest of the pipeline's estimates
+        for tokens in range(self.STEP, len(prompt) // 4 + 1, self.STEP):
+            digest.update(prompt[(tokens - self.STEP) * 4:tokens * 4].encode("utf-8"))
+            if tokens >= self.MIN_TOKENS:
+                prefixes.append((tokens, digest.hexdigest()))
+        with self._lock:
+            cached = max((tokens for tokens, key in prefixes if key in self._seen), default=0)
+            for _, key in prefixes:
+                self._seen.pop(key, None)
+                self._seen[key] = None
+            while len(self._seen) > self.size:
+                del self._seen[next(iter(self._seen))]
+        return cached
+
+
+def canned_usage(prompt: str, text: str, cache: Optional[PrefixCache] = None) -> Usage:
+    return {
+        "input_tokens": len(prompt) // 4,
+        "output_tokens": len(text) // 4,
+        "cached_tokens": cache.cached_tokens(prompt) if cache is not None else 0,
+    }
+
+
+def fake_failure() -> InternalServerError:
+    request = httpx.Request("POST", "http://fake-llm/v1/responses")
+    return InternalServerError("Simulated provider failure", response=httpx.Response(500, request=request), body=None)
+
+
+class FakeProvider(Provider):
+    """
+    In-process stand-in for offline benchmarks and CI: canned_answer() after
+    `latency` seconds, failing with a 500 for a `failure_rate` share of calls.
+    A call that would outlive the request's deadline times out like a real one.
+    Usage reports cached tokens as a provider's prompt cache would (PrefixCache).
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prefixes = PrefixCache()
+
+    def _wait(self) -> float:
+        left = deadline.remaining()
+        return self.latency if left is None else max(0.0, min(self.latency, left))
+
+    def _answer(self, system_prompt, user_prompt, schema, context, waited):
+        if waited < self.latency:
+            raise APITimeoutError(request=httpx.Request("POST", "http://fake-llm/v1/responses"))
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise fake_failure()
+        text = canned_answer(system_prompt, user_prompt if context is None else context, schema)
+        prompt = prompt_text(schema, _messages(system_prompt, user_prompt, context))
+        return text, canned_usage(prompt, text, self._prefixes)
+
+    def complete(self, model, system_prompt, user_prompt, schema, context=None):
+        wait = self._wait()
+        time.sleep(wait)
+        return self._answer(system_prompt, user_prompt, schema, context, wait)
+
+    async def acomplete(self, model, system_prompt, user_prompt, schema, context=None):
+        wait = self._wait()
+        await asyncio.sleep(wait)
+        return self._answer(system_prompt, user_prompt, schema, context, wait)
+
+
+_providers: Dict[tuple, Provider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider() -> Provider:
+    """The provider configured in settings (one instance per configuration, shared by the process)."""
+    name = getattr(settings, "LLM_PROVIDER", "openai")
+    if name == "fake":
+        config = (name, getattr(settings, "LLM_FAKE_LATENCY", 0.0), getattr(settings, "LLM_FAKE_FAILURE_RATE", 0.0))
+    elif name == "openai":
+        config = (name, getattr(settings, "LLM_BASE_URL", None) or None)
+    else:
+        raise ValueError(f"Unknown LLM_PROVIDER {name!r}; use 'openai' or 'fake'")
+
+    provider = _providers.get(config)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(config)
+            if provider is None:
+                provider = _providers[config] = (
+                    FakeProvider(config[1], config[2]) if name == "fake" else OpenAIProvider(config[1])
+                )
+    return provider
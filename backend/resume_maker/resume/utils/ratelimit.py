@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from ..models import LLMRateBucket
+from . import deadline, metrics
+from .resilience import ProviderUnavailable
+
+# Account-wide rate limiting for OpenAI calls. Two token buckets (requests per
+# minute, tokens per minute) live in the LLMRateBucket table and are shared by
+# every worker process. A process leases a slice of the budget at a time and
+# serves calls from it in memory, so most calls never touch the database.
+
+# Share of a minute's budget a process leases at once
+LEASE_SHARE = 0.05
+# Output tokens counted for every call on top of its prompt
+ESTIMATED_OUTPUT_TOKENS = 600
+
+_local: Dict[str, float] = {"requests": 0.0, "tokens": 0.0}
+_local_lock = threading.Lock()
+
+
+class RateLimitBusy(ProviderUnavailable):
+    """The account's rate limit budget is used up for longer than a call may wait."""
+
+
+def _capacities() -> Dict[str, float]:
+    return {
+        "requests": getattr(settings, "LLM_RATE_LIMIT_RPM", 0),
+        "tokens": getattr(settings, "LLM_RATE_LIMIT_TPM", 0),
+    }
+
+
+def _enabled() -> bool:
+    return all(_capacities().values())
+
+
+def estimate_tokens(*prompts: str) -> int:
+    """Tokens a call is charged before it is sent (approx. 4 chars/token, plus its output)."""
+    return sum(len(p) for p in prompts) // 4 + ESTIMATED_OUTPUT_TOKENS
+
+
+def _take_local(tokens: int) -> bool:
+    with _local_lock:
+        if _local["requests"] < 1 or _local["tokens"] < tokens:
+            return False
+        _local["requests"] -= 1
+        _local["tokens"] -= tokens
+        return True
+
+
+def _lease(tokens: int) -> float:
+    """
+    Move a slice of the shared budget into this process.
+    Returns 0 once leased, or the seconds until the buckets hold enough for the call.
+    """
+    capacity = _capacities()
+    need = {"requests": 1, "tokens": tokens}
+    now = time.time()
+    with transaction.atomic():
+        buckets = {b.name: b for b in LLMRateBucket.objects.select_for_update().filter(name__in=capacity)}
+        for name, size in capacity.items():
+            if name not in buckets:
+                buckets[name], _ = LLMRateBucket.objects.get_or_create(
+                    name=name, defaults={"level": size, "refilled_at": now}
+                )
+
+        with _local_lock:
+            held = dict(_local)
+        levels, wait = {}, 0.0
+        for name, size in capacity.items():
+            bucket = buckets[name]
+            per_second = size / 60
+            levels[name] = min(size, bucket.level + max(0.0, now - bucket.refilled_at) * per_second)
+            short = need[name] - held[name]
+            if levels[name] < short:
+                wait = max(wait, (short - levels[name]) / per_second)
+        if wait:
+            return wait
+
+        for name, size in capacity.items():
+            bucket = buckets[name]
+            # Top this process up to one lease, whichever resource ran out
+            granted = min(levels[name], max(0.0, max(need[name], size * LEASE_SHARE) - held[name]))
+            bucket.level = levels[name] - granted
+            bucket.refilled_at = now
+            bucket.save(update_fields=["level", "refilled_at"])
+            with _local_lock:
+                _local[name] += granted
+    metrics.incr("llm.ratelimit.leases")
+    return 0.0
+
+
+def _check_wait(waited: float, wait: float) -> float:
+    """How long to sleep before trying again, or raise if the call can't wait that long."""
+    max_wait = getattr(settings, "LLM_RATE_LIMIT_MAX_WAIT", 10)
+    if waited + wait > max_wait:
+        metrics.incr("llm.ratelimit.busy")
+        raise RateLimitBusy(wait)
+    left = deadline.remaining()
+    if left is not None and wait >= left:
+        raise deadline.DeadlineExceeded()
+    metrics.incr("llm.ratelimit.waits")
+    metrics.incr("llm.ratelimit.wait_seconds", wait)
+    # Jitter so processes waiting on the same refill don't all come back together
+    return wait + random.uniform(0, 0.1)
+
+
+def acquire(tokens: int) -> None:
+    """Block until the call fits the account's rate limits; raises RateLimitBusy past the max wait."""
+    if not _enabled():
+        return
+    waited = 0.0
+    while not _take_local(tokens):
+        # The limiter is best effort: a database error never fails the LLM call
+        try:
+            wait = _lease(tokens)
+        except DatabaseError as e:
+            print(f"LLM rate limiter failed: {e}")
+            metrics.incr("llm.ratelimit.error")
+            return
+        if wait:
+            sleep = _check_wait(waited, wait)
+            time.sleep(sleep)
+            waited += sleep
+
+
+async def aacquire(tokens: int) -> None:
+    """Async variant of acquire()."""
+    if not _enabled():
+        return
+    waited = 0.0
+    while not _take_local(tokens):
+        try:
+            wait = await sync_to_async(_lease)(tokens)
+        except DatabaseError as e:
+            print(f"LLM rate limiter failed: {e}")
+            metrics.incr("llm.ratelimit.error")
+            return
+        if wait:
+            sleep = _check_wait(waited, wait)
+            await asyncio.sleep(sleep)
+            waited += sleep
+
+
+def reset() -> None:
+    """Drop this process's leased budget (used by tests and benchmarks)."""
+    with _local_lock:
+        _local.update(requests=0.0, tokens=0.0)
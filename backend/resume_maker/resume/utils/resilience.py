@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+from tenacity import AsyncRetrying, RetryCallState, Retrying, retry_if_exception
+
+from . import deadline, metrics
+
+# Resilience around provider calls (used by the LLM gateway in llm.py).
+# Transient failures (429, 5xx, dropped connections) are retried with jittered
+# exponential backoff that honours the provider's Retry-After, and a circuit
+# breaker refuses calls for a while once the provider keeps failing, so
+# workers fail fast instead of piling up behind a degraded API.
+
+# Attempts per call, including the first
+MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+# Backoff: random wait up to BACKOFF_BASE * 2^n seconds, capped at BACKOFF_MAX
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+# A Retry-After longer than this is not waited for; the error is raised instead
+MAX_RETRY_AFTER = float(os.getenv("LLM_MAX_RETRY_AFTER", "60"))
+# Consecutive failed calls that open the circuit, and how long it stays open before a trial call
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+# A timeout this close to the request's deadline was cut short by the deadline, not by the provider
+DEADLINE_SLACK = 0.1
+
+T = TypeVar("T")
+
+
+class ProviderUnavailable(Exception):
+    """The call can't be made right now; the client should come back after retry_after seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitOpen(ProviderUnavailable):
+    """The provider is failing; the call was refused without being sent."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Rate limits, server errors, timeouts and connection failures are worth retrying."""
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return isinstance(exc, APIConnectionError)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers), if any."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and consecutive transient failures are counted.
+    Open: calls are refused with CircuitOpen until reset_seconds have passed.
+    Half-open: one trial call goes through; its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half-open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            wait = self._opened_at + self.reset_seconds - time.monotonic()
+            if wait <= 0 and not self._trial_running:
+                self._trial_running = True
+                return
+        metrics.incr("llm.circuit.rejected")
+        raise CircuitOpen(max(wait, 1.0))
+
+    def check(self) -> None:
+        """Raise CircuitOpen while the circuit is open (without taking the half-open trial call)."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            wait = self._opened_at + self.reset_seconds - time.monotonic()
+        if wait > 0:
+            metrics.incr("llm.circuit.rejected")
+            raise CircuitOpen(max(wait, 1.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                metrics.incr("llm.circuit.open_seconds", time.monotonic() - self._opened_at)
+                print("LLM circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running:
+                # The trial failed: stay open for another period
+                metrics.incr("llm.circuit.open_seconds", time.monotonic() - self._opened_at)
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+            elif self._opened_at is None and self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                metrics.incr("llm.circuit.opened")
+                print(f"LLM circuit opened after {self._failures} consecutive failures")
+
+    def release(self) -> None:
+        """Forget a trial call that ended without a verdict (cancelled, deadline hit before sending)."""
+        with self._lock:
+            self._trial_running = False
+
+    def reset(self) -> None:
+        """Close the circuit and forget past failures (used by tests and benchmarks)."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+
+# Shared by every provider call in the process
+breaker = CircuitBreaker()
+
+
+def _wait(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception()
+    asked = retry_after(exc)
+    if asked is not None and asked >= 0:
+        # A little jitter so callers told the same Retry-After don't return together
+        return asked + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (retry_state.attempt_number - 1)))
+
+
+def _stop(retry_state: RetryCallState) -> bool:
+    if retry_state.attempt_number >= MAX_ATTEMPTS:
+        return True
+    sleep = retry_state.upcoming_sleep
+    if sleep > MAX_RETRY_AFTER:
+        return True
+    # Don't sleep past the request's deadline (the next attempt needs time too)
+    left = deadline.remaining()
+    return left is not None and sleep >= left
+
+
+def _before_sleep(retry_state: RetryCallState) -> None:
+    exc = retry_state.outcome.exception()
+    metrics.incr("llm.retries")
+    metrics.incr("llm.retry_wait_seconds", retry_state.upcoming_sleep)
+    print(f"LLM call failed ({type(exc).__name__}), retry {retry_state.attempt_number} "
+          f"in {retry_state.upcoming_sleep:.1f}s")
+
+
+def _give_up(retry_state: RetryCallState):
+    exc = retry_state.outcome.exception()
+    left = deadline.remaining()
+    if left is not None and retry_state.upcoming_sleep >= left:
+        # Out of time rather than out of attempts: the parser marks the section missing
+        raise deadline.DeadlineExceeded() from exc
+    raise exc
+
+
+def _policy() -> dict:
+    return dict(
+        retry=retry_if_exception(is_transient),
+        wait=_wait,
+        stop=_stop,
+        before_sleep=_before_sleep,
+        retry_error_callback=_give_up,
+    )
+
+
+def _cut_by_deadline(exc: BaseException) -> bool:
+    # The gateway sizes the HTTP timeout to the remaining budget (providers._bounded),
+    # so a timeout once the budget is spent says nothing about the provider
+    left = deadline.remaining()
+    return isinstance(exc, APITimeoutError) and left is not None and left <= DEADLINE_SLACK
+
+
+def _record(exc: BaseException) -> None:
+    # Only provider trouble counts against the circuit; a 400 means it is up
+    if is_transient(exc):
+        breaker.record_failure()
+    elif isinstance(exc, APIStatusError):
+        breaker.record_success()
+    else:
+        breaker.release()
+
+
+def call(fn: Callable[[], T]) -> T:
+    """Run a blocking provider call with retries, behind the circuit breaker."""
+    def attempt() -> T:
+        breaker.before_call()
+        try:
+            result = fn()
+        except BaseException as e:
+            if _cut_by_deadline(e):
+                breaker.release()
+                raise deadline.DeadlineExceeded() from e
+            _record(e)
+            raise
+        breaker.record_success()
+        return result
+
+    return Retrying(**_policy())(attempt)
+
+
+async def acall(fn: Callable[[], Awaitable[T]]) -> T:
+    """Async variant of call()."""
+    async def attempt() -> T:
+        breaker.before_call()
+        try:
+            result = await fn()
+        except BaseException as e:
+            if _cut_by_deadline(e):
+                breaker.release()
+                raise deadline.DeadlineExceeded() from e
+            _record(e)
+            raise
+        breaker.record_success()
+        return result
+
+    return await AsyncRetrying(**_policy())(attempt)
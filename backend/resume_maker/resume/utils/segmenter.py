@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List
+
+# Routes the parts of a user's text to the section agents that need them.
+# The input is split into paragraphs (long ones into sentences), each segment is
+# scored against cheap keyword/pattern rules per section, and every agent gets
+# a short shared header plus its own segments instead of the whole text.
+
+# Segments longer than this are split into sentences before routing
+MAX_SEGMENT_CHARS = 400
+
+# Segments up to this long without a full stop are treated as headings
+MAX_HEADING_CHARS = 40
+
+# Leading characters of the input sent to every agent (usually who the person is)
+HEADER_CHARS = 300
+
+# If less than this share of the text can be routed, every agent gets everything
+MIN_ROUTED_SHARE = 0.6
+
+# Sections that always see the full text
+FULL_TEXT_SECTIONS = ("profile",)
+
+_YEAR_RANGE = r"\b(?:19|20)\d\d\s*(?:-|–|to)\s*(?:(?:19|20)\d\d|present|now|current)\b"
+
+SECTION_PATTERNS: Dict[str, re.Pattern] = {
+    "name": re.compile(r"(?i)\b(?:my name is|i['’]m|i am|name\s*:)"),
+    "personal_info": re.compile(
+        r"(?i)(?:[\w.+-]+@[\w-]+\.[\w.-]+|\+\d[\d\s().-]{6,}\d|\(\d{2,4}\)\s*\d|\b\d{3}[.-]\d{3,4}[.-]\d{4}\b"
+        r"|github\.com|linkedin\.com"
+        r"|\b(?:email|e-mail|phone|mobile|contact me|my name is|i['’]m|i am)\b)"
+    ),
+    "education": re.compile(
+        r"(?i)\b(?:education|universit(?:y|ies)|college|school|academy|institute|faculty|bachelor'?s?|master'?s?"
+        r"|ph\.?d|doctorate|degree|diploma|b\.?sc|m\.?sc|b\.?a\.?|m\.?a\.?|mba|gpa|graduat(?:ed|e|ing)"
+        r"|major(?:ed)?|minor|studied|studying|thesis|coursework)\b"
+    ),
+    "experience": re.compile(
+        rf"(?i)(?:\b(?:experience|employment|career|worked|working|work|employed|employer|job|intern(?:ship)?|position|role|company"
+        rf"|engineer|developer|manager|analyst|consultant|designer|lead|led|responsible|joined|founded"
+        rf"|freelanc(?:e|er|ing)|contract(?:or)?|team|clients?|projects?|built|shipped|launched)\b|{_YEAR_RANGE})"
+    ),
+    "courses": re.compile(
+        r"(?i)\b(?:course|courses|certificat(?:e|es|ion|ions)|certified|bootcamp|workshop|training"
+        r"|coursera|udemy|edx|udacity|mooc|nanodegree|seminar|license[ds]?)\b"
+    ),
+    "skills": re.compile(
+        r"(?i)\b(?:skills?|proficient|fluent|familiar|expertise|experienced in|knowledge of|tools?"
+        r"|languages?|frameworks?|libraries|stack|python|java(?:script)?|typescript|sql|c\+\+|c#|go"
+        r"|rust|react|django|docker|kubernetes|aws|excel|figma|english|spanish|german|french)\b"
+    ),
+    "references": re.compile(
+        r"(?i)\b(?:references?|referees?|recommend(?:ation|ed)?|vouch|supervisor|mentor|manager at)\b"
+    ),
+}
+
+_PARAGRAPH = re.compile(r"\n\s*\n|\n(?=\s*[-•*]\s)")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+
+def split_segments(text: str) -> List[str]:
+    """Paragraphs (and bullet lines), with long paragraphs split into sentences."""
+    segments = []
+    for paragraph in _PARAGRAPH.split(text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= MAX_SEGMENT_CHARS:
+            segments.append(paragraph)
+        else:
+            segments.extend(s.strip() for s in _SENTENCE.split(paragraph) if s.strip())
+    return segments
+
+
+def _is_heading(segment: str) -> bool:
+    return len(segment) <= MAX_HEADING_CHARS and "\n" not in segment and not segment.endswith(".")
+
+
+def route(segments: Iterable[str]) -> List[List[str]]:
+    """
+    Sections each segment is relevant to (empty list for unroutable segments).
+    Segments under a heading such as "EDUCATION" also go to the heading's sections.
+    """
+    routes, heading = [], []
+    for segment in segments:
+        matched = [section for section, pattern in SECTION_PATTERNS.items() if pattern.search(segment)]
+        if _is_heading(segment):
+            heading = matched
+        else:
+            matched += [section for section in heading if section not in matched]
+        routes.append(matched)
+    return routes
+
+
+def segment(text: str, sections: Iterable[str]) -> Dict[str, str]:
+    """
+    Return the text each section agent should see.
+    Segments no rule matched go to every section, so nothing is lost when a
+    rule misses; if too little of the text is routable, all sections get the
+    whole input.
+    """
+    sections = list(sections)
+    full = {section: text for section in sections}
+    segments = split_segments(text)
+    if len(segments) < 2:
+        return full
+
+    routes = route(segments)
+    routed_chars = sum(len(s) for s, r in zip(segments, routes) if r)
+    if routed_chars < MIN_ROUTED_SHARE * sum(len(s) for s in segments):
+        return full
+
+    header = segments[0][:HEADER_CHARS]
+    slices = {}
+    for section in sections:
+        if section in FULL_TEXT_SECTIONS:
+            slices[section] = text
+            continue
+        # Keep the original order so dates stay next to their entries
+        parts = []
+        for i, (part, routed_to) in enumerate(zip(segments, routes)):
+            if section in routed_to or not routed_to:
+                parts.append(part)
+            elif i == 0:
+                parts.append(header)
+        slices[section] = "\n\n".join(parts)
+    return slices
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import math
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+from . import metrics
+
+# Single-flight coalescing: identical requests arriving together (double-clicks,
+# frontend retries) wait for one run and share its result.
+# Within a process the waiters share a future (works across threads and event
+# loops); across processes the leader holds a lock in the 'coordination' cache
+# and publishes its result there for SINGLEFLIGHT_RESULT_TTL seconds, just long
+# enough for the waiters' next poll. It is not a response cache: a repeat that
+# arrives after that runs again.
+
+CACHE_ALIAS = "coordination"
+
+# How often a waiter in another process checks for the leader's result
+POLL_INTERVAL = 0.25
+# A waiter gives up on another process this long after the run's own deadline
+WAIT_MARGIN = 10
+# Assumed length of a run when the parser has no deadline (PARSER_DEADLINE_SECONDS <= 0)
+UNBOUNDED_RUN_SECONDS = 150
+
+_inflight: Dict[str, concurrent.futures.Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class _LeaderCancelled(Exception):
+    """The run being waited on was cancelled (e.g. its client disconnected)."""
+
+
+def make_key(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _enabled() -> bool:
+    return getattr(settings, "SINGLEFLIGHT_ENABLED", True)
+
+
+def _run_seconds() -> float:
+    # A run ends within the parser's deadline (settings.PARSER_DEADLINE_SECONDS)
+    seconds = getattr(settings, "PARSER_DEADLINE_SECONDS", 90)
+    return seconds if seconds and seconds > 0 else UNBOUNDED_RUN_SECONDS
+
+
+def _wait_timeout() -> float:
+    """How long to wait for another process's run before running the work locally."""
+    return _run_seconds() + WAIT_MARGIN
+
+
+def _lock_ttl() -> int:
+    """The leader's lock expires after this long, in case its process dies mid-run."""
+    return math.ceil(2 * _run_seconds())
+
+
+async def coalesce(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Run fn() once for every concurrent caller with the same key and return its result."""
+    if not _enabled():
+        return await fn()
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = concurrent.futures.Future()
+
+    if not leader:
+        metrics.incr("singleflight.shared_local")
+        try:
+            # Shielded: a waiter that is cancelled must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except _LeaderCancelled:
+            return await coalesce(key, fn)
+
+    try:
+        result = await _run_shared(key, fn)
+    except asyncio.CancelledError:
+        _settle(future, exception=_LeaderCancelled())
+        raise
+    except Exception as e:
+        _settle(future, exception=e)
+        raise
+    else:
+        _settle(future, result=result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _settle(future: concurrent.futures.Future, result: Any = None,
+            exception: Optional[BaseException] = None) -> None:
+    # The future can only be settled once; one that is already done has no waiters left to tell
+    if future.done():
+        return
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+async def _run_shared(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Run fn() unless another process is already running it, then wait for its result."""
+    cache = caches[CACHE_ALIAS]
+    lock_key, result_key = f"singleflight:lock:{key}", f"singleflight:result:{key}"
+    deadline = time.monotonic() + _wait_timeout()
+    # Coordination is best effort: a cache error never fails the request
+    try:
+        while True:
+            result = await cache.aget(result_key)
+            if result is not None:
+                metrics.incr("singleflight.shared_remote")
+                return result
+            if await cache.aadd(lock_key, 1, _lock_ttl()):
+                break
+            if time.monotonic() > deadline:
+                metrics.incr("singleflight.wait_timeout")
+                return await fn()
+            await asyncio.sleep(POLL_INTERVAL)
+    except DatabaseError as e:
+        print(f"Single-flight coordination failed: {e}")
+        metrics.incr("singleflight.error")
+        return await fn()
+
+    try:
+        result = await fn()
+        await _publish(cache, result_key, result)
+        return result
+    finally:
+        try:
+            await cache.adelete(lock_key)
+        except DatabaseError as e:
+            print(f"Single-flight unlock failed: {e}")
+
+
+async def _publish(cache, result_key: str, result: Any) -> None:
+    try:
+        await cache.aset(result_key, result, getattr(settings, "SINGLEFLIGHT_RESULT_TTL", 2))
+    except DatabaseError as e:
+        print(f"Single-flight publish failed: {e}")
+        metrics.incr("singleflight.error")
@@ -1,63 +1,127 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from pathlib import Path
+import asyncio
 import json
+import math
 
-from .utils.parser import parse_resume_input
-from .models import ResumeModel, ResumeJson
-from .templates.template import create_pdf
+from .utils.parser import PARSER_MODES, extract_for_user_async, stream_resume_input_async
+from .models import ResumeModel, ResumeJson, ResumeJob
+from .jobs import enqueue_job
+from .utils import metrics
+from .utils.admission import Overloaded, llm_gate, pdf_gate
+from .utils.resilience import ProviderUnavailable, breaker
+from .templates.template import create_pdf_bytes
 from payment.models import Payment
 # Create your views here.
 
 
-class ResumeView(APIView):
+# WeasyPrint is CPU bound, so it runs in worker threads instead of on the event loop.
+# Renders get their own pool so a burst of them can't take the threads other work needs.
+_pdf_executor = ThreadPoolExecutor(max_workers=settings.ADMISSION_PDF_CONCURRENCY, thread_name_prefix='pdf')
+
+
+async def render_pdf_async(normalized_data, template_name, css_name) -> bytes:
+    async with pdf_gate.admit():
+        return await asyncio.get_running_loop().run_in_executor(
+            _pdf_executor, create_pdf_bytes, normalized_data, template_name, css_name
+        )
+
+
+def _pdf_response(pdf_bytes: bytes) -> HttpResponse:
+    response = HttpResponse(pdf_bytes, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="resume.pdf"'
+    return response
+
+
+def _unavailable(e) -> Response:
+    # This instance is saturated, the LLM provider is failing or our rate limit is used up:
+    # tell the client when to come back instead of tying up a worker
+    if isinstance(e, Overloaded):
+        error = "Server is busy, please retry shortly"
+    else:
+        error = "Resume extraction is temporarily unavailable, please retry shortly"
+    response = Response({"error": error}, status=503)
+    response['Retry-After'] = str(math.ceil(e.retry_after))
+    return response
+
+
+class ResumeView(AsyncAPIView):
     """
     POST: Generate a PDF resume from raw user input text.
+    Optional "mode": "graph" (default) or "single".
     """
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    async def post(self, request):
         # Get user input
         user_input = request.data.get("user_input", "")
         if not user_input:
             return Response({"error": "Missing user_input"}, status=400)
+        mode = request.data.get("mode")
+        if mode and mode not in PARSER_MODES:
+            return Response({"error": f"Invalid mode. Use one of: {', '.join(PARSER_MODES)}"}, status=400)
         print(user_input)
-        # Parse and normalize
-        normalized_data = parse_resume_input(user_input)
+        # Parse and normalize, reusing the sections an edit didn't touch
+        # (a double-click shares the first request's run)
+        try:
+            async with llm_gate.admit():
+                normalized_data, sections = await extract_for_user_async(request.user.pk, user_input, mode=mode)
+        except (Overloaded, ProviderUnavailable) as e:
+            return _unavailable(e)
 
         # Create model entry
-        resume_model = ResumeModel.objects.create(
+        resume_model = await ResumeModel.objects.acreate(
             user=request.user,
-            user_input=user_input
+            user_input=user_input,
+            sections=sections
         )
-        resume_json = ResumeJson.objects.create(
+        resume_json = await ResumeJson.objects.acreate(
             user=request.user,
             json_input=normalized_data
         )
         # Create PDF
         template_name = request.data.get("template_name", "harward_style")
         css_name = request.data.get("css_name", "harward")
-        pdf_path = create_pdf(normalized_data, template_name=template_name, css_name=css_name)
+        try:
+            pdf_bytes = await render_pdf_async(normalized_data, template_name, css_name)
+        except Overloaded as e:
+            return _unavailable(e)
 
-        with open(pdf_path, 'rb') as pdf_file:
-            response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="resume.pdf"'
-            return response
+        return _pdf_response(pdf_bytes)
 
 
-class ResumeJsonView(APIView):
+class ResumeJsonView(AsyncAPIView):
     """
     POST: Parse raw resume text and return normalized JSON.
+    Optional "mode": "graph" (default) or "single".
     """
     permission_classes = [IsAuthenticated]
-    def post(self, request):
+    async def post(self, request):
         user_input = request.data.get("user_input", "")
         if not user_input:
             return Response({"error": "Missing user_input"}, status=400)
-        normalized_data = parse_resume_input(user_input)
-        resume_json = ResumeJson.objects.create(
+        mode = request.data.get("mode")
+        if mode and mode not in PARSER_MODES:
+            return Response({"error": f"Invalid mode. Use one of: {', '.join(PARSER_MODES)}"}, status=400)
+        # Users iterate on their text: only sections whose paragraphs changed are extracted again
+        try:
+            async with llm_gate.admit():
+                normalized_data, sections = await extract_for_user_async(request.user.pk, user_input, mode=mode)
+        except (Overloaded, ProviderUnavailable) as e:
+            return _unavailable(e)
+        resume_model = await ResumeModel.objects.acreate(
+                user=request.user,
+                user_input=user_input,
+                sections=sections
+        )
+        resume_json = await ResumeJson.objects.acreate(
                 user=request.user,
                 json_input=normalized_data
         )
@@ -65,13 +129,63 @@ class ResumeJsonView(APIView):
 
 
 
-class ResumePdfFromJsonView(APIView):
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ResumeJsonStreamView(AsyncAPIView):
+    """
+    POST: Parse raw resume text and stream Server-Sent Events:
+    one 'section' event per section as soon as it is validated,
+    then a 'done' event with the full normalized JSON.
+    """
+    permission_classes = [IsAuthenticated]
+    async def post(self, request):
+        user_input = request.data.get("user_input", "")
+        if not user_input:
+            return Response({"error": "Missing user_input"}, status=400)
+        user = request.user
+
+        async def events():
+            # The admission is held for as long as the stream runs
+            async with llm_gate.admit():
+                yield None
+                try:
+                    async for event, data in stream_resume_input_async(user_input):
+                        if event == "done":
+                            await ResumeJson.objects.acreate(user=user, json_input=data)
+                        yield _sse(event, data)
+                except ProviderUnavailable as e:
+                    # Too late for a 503: the client gets the same advice as an event
+                    yield _sse("error", {"error": "Resume extraction is temporarily unavailable, please retry shortly",
+                                         "retry_after": math.ceil(e.retry_after)})
+                except Exception as e:
+                    print(f"Resume stream error: {e}")
+                    yield _sse("error", {"error": "Resume extraction failed"})
+
+        # Admit (or turn away) the request before the stream's headers are sent
+        stream = events()
+        try:
+            breaker.check()
+            await stream.__anext__()
+        except (Overloaded, ProviderUnavailable) as e:
+            await stream.aclose()
+            return _unavailable(e)
+
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ResumePdfFromJsonView(AsyncAPIView):
     """
     POST: Generate a PDF resume from a JSON input.
     Requires payment verification - payment_id must be provided and valid.
     """
     permission_classes = [IsAuthenticated]
-    def post(self, request):
+    async def post(self, request):
         json_input = request.data.get("json_input", "{}")
         payment_id = request.data.get("payment_id")
 
@@ -80,7 +194,7 @@ class ResumePdfFromJsonView(APIView):
             return Response({"error": "Payment required. Missing payment_id"}, status=402)
 
         try:
-            payment = Payment.objects.get(id=payment_id, user=request.user)
+            payment = await Payment.objects.aget(id=payment_id, user=request.user)
         except Payment.DoesNotExist:
             return Response({"error": "Payment not found"}, status=404)
 
@@ -100,7 +214,9 @@ class ResumePdfFromJsonView(APIView):
         css_name = request.data.get("css_name", "harward")
 
         try:
-            pdf_path = create_pdf(normalized_data, template_name=template_name, css_name=css_name)
+            pdf_bytes = await render_pdf_async(normalized_data, template_name, css_name)
+        except Overloaded as e:
+            return _unavailable(e)
         except Exception as e:
             import traceback
             print(f"PDF generation error: {e}")
@@ -109,39 +225,102 @@ class ResumePdfFromJsonView(APIView):
 
         # Mark payment as used
         payment.resume_downloaded = True
-        payment.save()
+        await payment.asave()
 
-        with open(pdf_path, 'rb') as pdf_file:
-            response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="resume.pdf"'
-            return response
+        return _pdf_response(pdf_bytes)
 
 
-class ResumeDataView(APIView):
+class ResumeJobView(AsyncAPIView):
+    """
+    POST: Queue resume generation for the background worker and return the job id.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        user_input = request.data.get("user_input", "")
+        if not user_input:
+            return Response({"error": "Missing user_input"}, status=400)
+
+        job = await sync_to_async(enqueue_job)(
+            request.user,
+            user_input,
+            template_name=request.data.get("template_name", "harward_style"),
+            css_name=request.data.get("css_name", "harward"),
+        )
+        return Response({"job_id": job.id, "status": job.status}, status=202)
+
+
+class ResumeJobStatusView(AsyncAPIView):
+    """
+    GET: Return a job's status and, once finished, its JSON result and PDF link.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, job_id):
+        try:
+            job = await ResumeJob.objects.defer("pdf").aget(id=job_id, user=request.user)
+        except ResumeJob.DoesNotExist:
+            return Response({"error": "Job not found"}, status=404)
+
+        data = {"job_id": job.id, "status": job.status}
+        if job.status == 'succeeded':
+            data["result"] = job.result
+            data["pdf_url"] = request.build_absolute_uri(f"{request.path.rstrip('/')}/pdf/")
+        elif job.status == 'failed':
+            data["error"] = job.error
+        return Response(data, status=200)
+
+
+class ResumeJobPdfView(AsyncAPIView):
+    """
+    GET: Download the PDF produced by a finished job.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, job_id):
+        try:
+            job = await ResumeJob.objects.aget(id=job_id, user=request.user)
+        except ResumeJob.DoesNotExist:
+            return Response({"error": "Job not found"}, status=404)
+
+        if job.status != 'succeeded' or not job.pdf:
+            return Response({"error": "PDF not ready", "status": job.status}, status=409)
+
+        return _pdf_response(bytes(job.pdf))
+
+
+class ResumeDataView(AsyncAPIView):
     """
     GET: Retrieve user's saved resume JSON data.
     POST: Save/update user's resume JSON data.
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        resume = ResumeJson.objects.filter(user=request.user).order_by('-id').first()
+    async def get(self, request):
+        resume = await ResumeJson.objects.filter(user=request.user).order_by('-id').afirst()
         if not resume:
             return Response({"data": None}, status=200)
         return Response({"data": resume.json_input}, status=200)
 
-    def post(self, request):
+    async def post(self, request):
         json_data = request.data.get("data")
         if not json_data:
             return Response({"error": "Missing data"}, status=400)
 
         # Update existing or create new
-        resume, created = ResumeJson.objects.update_or_create(
+        resume, created = await ResumeJson.objects.aupdate_or_create(
             user=request.user,
             defaults={"json_input": json_data}
         )
         return Response({"message": "Resume saved successfully"}, status=200)
 
 
+class MetricsView(APIView):
+    """
+    GET: Pipeline counters of this worker process (LLM cache hits/misses, ...).
+    Staff only.
+    """
+    permission_classes = [IsAdminUser]
 
-
+    def get(self, request):
+        return Response(metrics.snapshot(), status=200)
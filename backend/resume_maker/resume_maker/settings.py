@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
+    'adrf',
     'resume',
     'register',
     'payment',
@@ -82,6 +83,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'resume_maker.wsgi.application'
 
+# Production serves the ASGI app so the async LLM views can share one event loop
+ASGI_APPLICATION = 'resume_maker.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -100,6 +104,22 @@ else:
     }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'coordination' is shared by every web and worker process (it lives in the
+# database); create its table with `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'coordination': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'resume_coordination_cache',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -198,3 +218,80 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
 STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+
+# LLM provider (resume/utils/providers.py): "openai" for OpenAI or any server implementing its
+# Responses API at LLM_BASE_URL (a self-hosted model, `manage.py run_llm_stub`), or "fake" for
+# in-process canned answers (offline benchmarks and CI)
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'openai')
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL', '')
+# Fake provider: seconds per call and share of calls failing with a 500
+LLM_FAKE_LATENCY = float(os.environ.get('LLM_FAKE_LATENCY', '0'))
+LLM_FAKE_FAILURE_RATE = float(os.environ.get('LLM_FAKE_FAILURE_RATE', '0'))
+
+# Model cascade per agent, cheapest first: each agent runs on its first model, and a section whose
+# output fails validation is retried on the next one. LLM_MODEL_<AGENT> overrides one agent's
+# cascade (comma separated, e.g. LLM_MODEL_SKILLS=gpt-4o-mini,gpt-4o)
+LLM_MODELS = {
+    agent: os.environ.get(f'LLM_MODEL_{agent.upper()}', cascade).split(',')
+    for agent, cascade in {
+        'name': 'gpt-4o-mini,gpt-4o',
+        'personal_info': 'gpt-4o-mini,gpt-4o',
+        'profile': 'gpt-4o-mini,gpt-4o',
+        'education': 'gpt-4o-mini,gpt-4o',
+        'experience': 'gpt-4o-mini,gpt-4o',
+        'courses': 'gpt-4o-mini,gpt-4o',
+        'skills': 'gpt-4o-mini,gpt-4o',
+        'references': 'gpt-4o-mini,gpt-4o',
+        'resume': 'gpt-4o',  # single-call mode (no retry of its own)
+    }.items()
+}
+
+# Share of the input price the provider takes off tokens served from its prompt cache. Section
+# agents sent the same full text only share one prompt prefix when that bills less (resume/agents/shared.py)
+LLM_CACHED_INPUT_DISCOUNT = float(os.environ.get('LLM_CACHED_INPUT_DISCOUNT', '0.5'))
+
+# LLM response cache (resume/utils/llm_cache.py)
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '10000'))
+
+# Resume parser pipeline: "graph" (one agent per section) or "single" (one call, per-section fallback)
+PARSER_MODE = os.environ.get('PARSER_MODE', 'graph')
+
+# Fill name and contacts by pattern matching when confident, skipping their agents
+PARSER_RULE_EXTRACTION = os.environ.get('PARSER_RULE_EXTRACTION', 'True').lower() == 'true'
+
+# Send each section agent only the paragraphs routed to it instead of the whole input
+PARSER_SEGMENTATION = os.environ.get('PARSER_SEGMENTATION', 'True').lower() == 'true'
+
+# Inputs above this many (approximate) tokens are extracted in overlapping chunks
+PARSER_LONG_INPUT_TOKENS = int(os.environ.get('PARSER_LONG_INPUT_TOKENS', '6000'))
+PARSER_CHUNK_TOKENS = int(os.environ.get('PARSER_CHUNK_TOKENS', '3000'))
+PARSER_CHUNK_OVERLAP_TOKENS = int(os.environ.get('PARSER_CHUNK_OVERLAP_TOKENS', '200'))
+
+# Time budget of one extraction; sections that can't finish in time come back empty and listed as missing
+PARSER_DEADLINE_SECONDS = float(os.environ.get('PARSER_DEADLINE_SECONDS', '90'))
+
+# Identical concurrent extractions share one run (resume/utils/singleflight.py). The result is
+# kept for waiters in other processes (polling every 0.25 s) only, not as a response cache
+SINGLEFLIGHT_ENABLED = os.environ.get('SINGLEFLIGHT_ENABLED', 'True').lower() == 'true'
+SINGLEFLIGHT_RESULT_TTL = int(os.environ.get('SINGLEFLIGHT_RESULT_TTL', '2'))  # seconds
+
+# OpenAI account limits shared by every worker (resume/utils/ratelimit.py); 0 disables the limiter
+LLM_RATE_LIMIT_RPM = int(os.environ.get('LLM_RATE_LIMIT_RPM', '500'))
+LLM_RATE_LIMIT_TPM = int(os.environ.get('LLM_RATE_LIMIT_TPM', '200000'))
+# A call waits at most this long for budget before the request is answered "busy, retry later"
+LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get('LLM_RATE_LIMIT_MAX_WAIT', '10'))  # seconds
+
+# Admission control for the generation endpoints (resume/utils/admission.py):
+# LLM pipelines and PDF renders running at once per worker process, and how many more may queue
+ADMISSION_LLM_CONCURRENCY = int(os.environ.get('ADMISSION_LLM_CONCURRENCY', '8'))
+ADMISSION_LLM_QUEUE = int(os.environ.get('ADMISSION_LLM_QUEUE', '16'))
+ADMISSION_PDF_CONCURRENCY = int(os.environ.get('ADMISSION_PDF_CONCURRENCY', '2'))
+ADMISSION_PDF_QUEUE = int(os.environ.get('ADMISSION_PDF_QUEUE', '8'))
+# Running at once across the worker processes of one instance (0 = per-process limits only)
+ADMISSION_INSTANCE_LLM_CONCURRENCY = int(os.environ.get('ADMISSION_INSTANCE_LLM_CONCURRENCY', '16'))
+ADMISSION_INSTANCE_PDF_CONCURRENCY = int(os.environ.get('ADMISSION_INSTANCE_PDF_CONCURRENCY', '4'))
+# Longest a request waits in the queue before it gets 503, and the Retry-After it is sent
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))  # seconds
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '5'))  # seconds
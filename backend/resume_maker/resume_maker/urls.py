@@ -24,8 +24,11 @@ from rest_framework_simplejwt.views import (
 )
 
 
-def health_check(request):
-    """Health check endpoint for DigitalOcean."""
+async def health_check(request):
+    """
+    Health check endpoint for DigitalOcean.
+    Async so it answers from the event loop even while every worker thread is busy.
+    """
     return JsonResponse({"status": "ok"})
 
 